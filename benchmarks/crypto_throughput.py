@@ -0,0 +1,145 @@
+"""Crypto throughput benchmark: Fernet against AES-GCM, per call and in bulk.
+
+Times single encrypt/decrypt calls (latency percentiles) and whole batches
+pushed through CryptoEngine at several worker counts (values and bytes per
+second), for each cipher. Results are written as JSON so runs can be
+compared against a baseline.
+
+    python -m benchmarks.crypto_throughput
+    python -m benchmarks.crypto_throughput --count 100000 --workers 1,2,4,8
+"""
+import argparse
+import json
+import os
+import secrets
+import string
+import time
+from datetime import datetime
+import cryptography
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from config import Config
+from utils.benchmark import (
+    StageBenchmark, compare_results, environment_info, peak_rss_bytes, write_results
+)
+from utils.crypto_engine import CryptoEngine
+
+CIPHER_KEYS = {
+    'fernet': Fernet.generate_key,
+    'aesgcm': lambda: AESGCM.generate_key(bit_length=256),
+}
+
+
+def make_plaintexts(count, length):
+    alphabet = string.ascii_letters + string.digits + string.punctuation
+    return [''.join(secrets.choice(alphabet) for _ in range(length)) for _ in range(count)]
+
+
+def time_batch(engine, fn_name, items, repeats):
+    """Best and median wall time of ``repeats`` full passes over ``items``"""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in getattr(engine, fn_name)(items):
+            pass
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[0], timings[len(timings) // 2]
+
+
+def batch_result(stage, items, best, median):
+    size = sum(len(item) for item in items)
+    return {
+        'stage': stage,
+        'count': len(items),
+        'best_s': best,
+        'median_s': median,
+        'ops_per_sec': len(items) / best,
+        'mb_per_sec': size / best / (1024 * 1024),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=20000, help="values per batch")
+    parser.add_argument('--length', type=int, default=16, help="plaintext length in characters")
+    parser.add_argument('--ciphers', default=','.join(CIPHER_KEYS))
+    parser.add_argument('--workers', default=f"1,{Config.CRYPTO_WORKERS}",
+                        help="comma-separated worker counts for the bulk runs")
+    parser.add_argument('--chunk-size', type=int, help="override Config.CRYPTO_CHUNK_SIZE")
+    parser.add_argument('--repeats', type=int, default=3, help="passes per bulk run")
+    parser.add_argument('--iterations', type=int, default=2000, help="timed single calls")
+    parser.add_argument('--label', help="free-form tag stored with the results")
+    parser.add_argument('--output', help="results file (default: benchmarks/results/...)")
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    plaintexts = make_plaintexts(args.count, args.length)
+    worker_counts = sorted({int(n) for n in args.workers.split(',') if n.strip()})
+    ciphers = [name.strip() for name in args.ciphers.split(',') if name.strip()]
+
+    latency = []
+    throughput = []
+    for cipher in ciphers:
+        key = CIPHER_KEYS[cipher]()
+        single = CryptoEngine(key=key, cipher=cipher, workers=1)
+        tokens = list(single.encrypt_many(plaintexts))
+        latency.append(StageBenchmark(f'{cipher}/encrypt', single.encrypt).run(plaintexts, args.iterations))
+        latency.append(StageBenchmark(f'{cipher}/decrypt', single.decrypt).run(tokens, args.iterations))
+
+        for workers in worker_counts:
+            engine = CryptoEngine(key=key, cipher=cipher, workers=workers, chunk_size=args.chunk_size)
+            try:
+                # Warm the pool so process start-up is not billed to the first pass
+                list(engine.encrypt_many(plaintexts[:engine.chunk_size * 2]))
+                for op, items in (('encrypt', plaintexts), ('decrypt', tokens)):
+                    best, median = time_batch(engine, f'{op}_many', items, args.repeats)
+                    throughput.append(batch_result(f'{cipher}/{op}/w{workers}', items, best, median))
+            finally:
+                engine.close()
+
+    document = {
+        'benchmark': 'crypto_throughput',
+        'label': args.label,
+        'environment': environment_info(
+            cryptography=cryptography.__version__,
+            peak_rss_bytes=peak_rss_bytes(),
+        ),
+        'input': {
+            'count': args.count,
+            'length': args.length,
+            'repeats': args.repeats,
+            'iterations': args.iterations,
+        },
+        'settings': {
+            name: getattr(Config, name) for name in dir(Config) if name.startswith('CRYPTO_')
+        },
+        'latency': latency,
+        'stages': throughput,
+    }
+
+    output = args.output or os.path.join(
+        Config.BASE_DIR, 'benchmarks', 'results',
+        f"crypto_throughput_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    write_results(output, document)
+
+    print(f"{'call':<18} {'p50':>9} {'p99':>9} {'ops/s':>10}")
+    for stage in latency:
+        print(f"{stage['stage']:<18} {stage['p50_ms'] * 1000:7.1f}us {stage['p99_ms'] * 1000:7.1f}us "
+              f"{stage['fps']:10.0f}")
+    print(f"{'bulk':<18} {'ops/s':>10} {'MiB/s':>8} {'best':>8}")
+    for stage in throughput:
+        print(f"{stage['stage']:<18} {stage['ops_per_sec']:10.0f} {stage['mb_per_sec']:8.2f} "
+              f"{stage['best_s']:7.3f}s")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print("change in bulk ops/s against baseline")
+        for name, old, new, pct in compare_results(baseline, document, metric='ops_per_sec'):
+            print(f"  {name:<18} {old:10.0f} -> {new:10.0f}  ({pct:+.1f}%)")
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""Face pipeline benchmark: detection, reference matching and preview rendering.
+
+Replays stored frames (``data/face_*.jpg`` by default, or any frame source
+spec) through each stage and reports latency percentiles, frames per second
+and peak memory. Results are written as JSON so runs with different
+detector settings or releases can be compared.
+
+    python -m benchmarks.face_pipeline
+    python -m benchmarks.face_pipeline --source video:session.mp4 --baseline old.json
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+import cv2
+import numpy as np
+from config import Config
+from utils.benchmark import (
+    StageBenchmark, environment_info, format_results, peak_rss_bytes, write_results
+)
+from utils.face_detection import FaceTracker
+from utils.frame_sources import create_frame_source
+from utils.preview import PreviewRenderer
+from utils.services import services
+
+STAGES = ('detect', 'match', 'preview')
+
+
+def load_frames(spec, limit):
+    """Decode up to ``limit`` frames from a source, unpaced and without looping"""
+    source = create_frame_source(spec, fps=0, loop=False)
+    if not source.open():
+        raise SystemExit(f"Could not open frame source {spec}")
+    try:
+        frames = []
+        for frame in source:
+            frames.append(frame)
+            if len(frames) >= limit:
+                break
+        return frames
+    finally:
+        source.release()
+
+
+def build_stages(security, frames, reference, names):
+    """(name, callable, inputs) for each requested stage, mirroring the live code paths"""
+    stages = []
+    if 'detect' in names:
+        stages.append(('detect', security._detect_face, frames))
+
+    if 'match' in names:
+        # Cached per user in the app, so prepared outside the timed call
+        template = security.face_templates.prepare(reference)
+        # Faces are located up front so only the comparison is timed
+        finder = FaceTracker(mode='full', scale=1.0)
+        faces = []
+        for frame in frames:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            boxes = finder.detect(gray)
+            if len(boxes):
+                faces.append((gray, max(boxes, key=lambda f: f[2] * f[3])))
+
+        def match(face):
+            gray, box = face
+            return security.face_matcher.score(gray, box, template)
+        if faces:
+            stages.append(('match', match, faces))
+        else:
+            print("Skipping match stage: no faces found in the frames")
+
+    if 'preview' in names:
+        import tkinter as tk
+        try:
+            root = tk.Tk()
+        except tk.TclError as e:
+            print(f"Skipping preview stage: {e}")
+        else:
+            root.withdraw()
+            height, width = frames[0].shape[:2]
+            canvas = tk.Canvas(root, width=width, height=height)
+            canvas.pack()
+            # Time every paint instead of the live frame-rate cap
+            PreviewRenderer.for_canvas(canvas).min_interval = 0
+
+            def preview(frame):
+                security.update_preview(canvas, frame)
+                root.update_idletasks()
+            stages.append(('preview', preview, frames))
+    return stages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default='images:' + os.path.join(Config.BASE_DIR, 'data'),
+                        help="frame source spec (camera[:n], video:<path>, images:<dir>)")
+    parser.add_argument('--max-frames', type=int, default=300,
+                        help="distinct frames to load from the source")
+    parser.add_argument('--iterations', type=int, default=200, help="timed calls per stage")
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--reference', help="reference image for matching (default: first frame)")
+    parser.add_argument('--stages', default=','.join(STAGES))
+    parser.add_argument('--detect-mode', choices=('tracked', 'full'),
+                        help="override Config.FACE_DETECT_MODE")
+    parser.add_argument('--detect-scale', type=float, help="override Config.FACE_DETECT_SCALE")
+    parser.add_argument('--label', help="free-form tag stored with the results")
+    parser.add_argument('--output', help="results file (default: benchmarks/results/...)")
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    frames = load_frames(args.source, args.max_frames)
+    if not frames:
+        raise SystemExit("No frames to benchmark")
+    reference = cv2.imread(args.reference) if args.reference else frames[0]
+    if reference is None:
+        raise SystemExit(f"Could not read reference image {args.reference}")
+
+    security = services.get('security')
+    if args.detect_mode:
+        security.face_tracker.mode = args.detect_mode
+    if args.detect_scale:
+        security.face_tracker.scale = args.detect_scale
+    names = [name.strip() for name in args.stages.split(',') if name.strip()]
+    results = []
+    for name, fn, inputs in build_stages(security, frames, reference, names):
+        bench = StageBenchmark(name, fn, warmup=args.warmup)
+        results.append(bench.run(inputs, args.iterations))
+
+    document = {
+        'benchmark': 'face_pipeline',
+        'label': args.label,
+        'environment': environment_info(
+            opencv=cv2.__version__,
+            numpy=np.__version__,
+            peak_rss_bytes=peak_rss_bytes(),
+        ),
+        'input': {
+            'source': args.source,
+            'frames': len(frames),
+            'frame_shape': list(frames[0].shape),
+            'iterations': args.iterations,
+        },
+        # Every tunable that affects the face pipeline, for comparing runs
+        'settings': {
+            name: getattr(Config, name) for name in dir(Config)
+            if name.startswith(('FACE_', 'CAMERA_'))
+        },
+        'detector': {
+            'mode': security.face_tracker.mode,
+            'scale': security.face_tracker.scale,
+            **security.face_tracker.stats(),
+        },
+        'stages': results,
+    }
+
+    output = args.output or os.path.join(
+        Config.BASE_DIR, 'benchmarks', 'results',
+        f"face_pipeline_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    write_results(output, document)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print(format_results(document, baseline))
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
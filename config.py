@@ -10,15 +10,81 @@ class Config:
         'host': 'localhost',
         'port': '5432'
     }
-    
+    DB_POOL_MIN = 1
+    DB_POOL_MAX = 10
+    DB_POOL_TIMEOUT = 5  # seconds to wait for a free connection
+    DB_POOL_HEALTH_CHECK_INTERVAL = 30  # seconds between SELECT 1 probes
+    CHANGE_FEED_OVERLAP_SECONDS = 5  # re-read window for late-committing writes
+    DB_WORKER_THREADS = 4  # background threads running model calls
+    UI_POLL_INTERVAL_MS = 30  # how often Tk picks up finished model calls
+
     # Security settings
-    SECRET_KEY = Fernet.generate_key()
+    SECRET_KEY = Fernet.generate_key()  # seeds key version 0 when no key file exists yet
+    KEY_ROTATION_BATCH_SIZE = 500  # rows re-encrypted and written back per transaction
     FINGERPRINT_TIMEOUT = 300  # seconds
+    AUTH_GRANT_TTL = FINGERPRINT_TIMEOUT  # seconds a face verification stays valid
+    AUTH_GRANT_OPERATIONS = ('decrypt_password', 'copy_password', 'delete_account')
+    CRYPTO_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # processes for bulk encrypt/decrypt
+    CRYPTO_CHUNK_SIZE = 256  # values per task sent to a crypto worker
+    CRYPTO_MAX_PENDING_CHUNKS = 2 * CRYPTO_WORKERS  # chunks in flight before the producer waits
     PASSWORD_EXPIRY_DAYS = 90
     MIN_PASSWORD_STRENGTH = 60
+    PASSWORD_STRENGTH_FULL_BITS = 80  # entropy that scores 100
+    CAMERA_INDEX = 0
+    CAMERA_FRAME_SIZE = (640, 480)
+    CAMERA_BUFFER_FRAMES = 4  # ring buffer of recent frames shared by subscribers
+    CAMERA_IDLE_TIMEOUT = 30  # seconds the device stays open with no subscribers
+    CAMERA_READ_TIMEOUT = 2.0  # seconds to wait for the device or a new frame
+    CAMERA_MAX_READ_FAILURES = 10  # consecutive failed reads before the device is dropped
+    # camera[:index], video:<path> or images:<dir>; replay sources run headless
+    FRAME_SOURCE = os.environ.get('ACCOUNT_MANAGER_FRAME_SOURCE', 'camera')
+    FRAME_SOURCE_FPS = 15  # replay rate for image directories and videos without one
+    FACE_DETECT_MODE = 'tracked'  # 'tracked' searches around the last face, 'full' scans every frame
+    FACE_DETECT_SCALE = 0.5  # cascade input scale; faces under ~24px / scale are missed
+    FACE_ROI_MARGIN = 0.5  # ROI padding on each side, as a fraction of the face size
+    FACE_FULL_SCAN_INTERVAL = 10  # tracked frames between forced full scans
+    FACE_MIN_SIZE = (30, 30)  # smallest face in full-frame pixels
+    FACE_TEMPLATE_SIZE = (128, 128)  # normalised reference face crop
+    FACE_TEMPLATE_PYRAMID_LEVELS = 3  # crop plus successively halved copies
+    FACE_MATCH_ACCEPT = 0.6  # rolling mean face-crop correlation that accepts
+    FACE_MATCH_REJECT = 0.25  # rolling mean that rejects without waiting
+    FACE_MATCH_WINDOW = 5  # frames in the rolling mean
+    FACE_MATCH_MIN_FRAMES = 2  # scored frames before any decision
+    FACE_MATCH_MAX_FRAMES = 60  # frames before an undecided verification fails
+    FACE_MATCH_TIMEOUT = 10  # seconds before an undecided verification fails
+    FACE_MATCH_SEARCH_MARGIN = 0.1  # crop padding that absorbs detector jitter
+    FACE_MATCH_COARSE_REJECT = 0.1  # coarse-level score that skips the full-size compare
+    FACE_GALLERY_LEVEL = 1  # template pyramid level compared during 1:N identification
+    FACE_IDENTIFY_MARGIN = 0.05  # lead over the runner-up needed for a frame to count
+    FACE_IDENTIFY_IMPOSTOR_FLOOR = 0.45  # runner-up assumed when too few users are enrolled to rank
+    FACE_IDENTIFY_ACCEPT = 0.7  # rolling mean a 1:N login needs, stricter than FACE_MATCH_ACCEPT
+    FACE_RECOGNITION_TOLERANCE = 0.6  # max embedding distance for FaceAuthenticator
+    FACE_CAPTURE_STEADY_FRAMES = 5  # consecutive frames with a face before auto-capture
+    FACE_INDEX_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # processes encoding new enrolment images
+    ANALYTICS_SNAPSHOT_INTERVAL = 3600  # seconds between analytics history rows
+    ANALYTICS_COMPACTION_INTERVAL = 6 * 3600  # seconds between rollup runs
+    ANALYTICS_STOP_TIMEOUT = 5  # seconds shutdown waits for a snapshot in progress
+    ANALYTICS_RAW_RETENTION_DAYS = 7
+    ANALYTICS_HOURLY_RETENTION_DAYS = 90
+    ANALYTICS_DAILY_RETENTION_DAYS = 730  # weekly rollups are kept forever
+    ANALYTICS_CHART_POINTS = 120  # upper bound on points in the history chart
+    ANALYTICS_HISTORY_RANGES = {  # label -> days shown in the history chart
+        'Day': 1,
+        'Week': 7,
+        'Month': 30,
+        'Year': 365,
+        'All': 3650,
+    }
+    ANALYTICS_DEFAULT_RANGE = 'Month'
     
     # UI Configuration
     WINDOW_SIZE = "1200x800"
+    ACCOUNT_PAGE_SIZE = 100  # rows per keyset page in the account list
+    ACCOUNT_CACHE_PAGES = 6  # pages kept around the viewport
+    SEARCH_DEBOUNCE_MS = 250  # idle time after a keystroke before searching
+    SEARCH_RESULT_LIMIT = 200  # ranked matches shown for a search
+    PREVIEW_MAX_FPS = 30  # camera preview frames drawn per second at most
+    PREVIEW_POLL_MS = 15  # how often Tk picks up the newest preview frame
     THEME_COLOR = {
         'primary': '#2c3e50',
         'secondary': '#34495e',
@@ -31,6 +97,8 @@ class Config:
     # File paths
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     LOG_FILE = os.path.join(BASE_DIR, 'logs', 'app.log')
+    COMMON_PASSWORDS_FILE = os.path.join(BASE_DIR, 'data', 'common_passwords.txt')
+    KEY_FILE = os.environ.get('ACCOUNT_MANAGER_KEY_FILE', os.path.join(BASE_DIR, 'keys', 'keys.json'))
     
     @staticmethod
     def init():
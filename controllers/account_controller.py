@@ -5,32 +5,33 @@ from models.analytics_model import AnalyticsModel
 from models.totp_model import TOTPModel
 from utils.security import SecurityUtils
 from utils.password_generator import PasswordGenerator
-from datetime import datetime
+from utils.snapshot_scheduler import SnapshotScheduler
+from datetime import datetime, timedelta
+import bisect
+from config import Config
 
 class AccountController:
-    def __init__(self, username, security, view=None):
+    def __init__(self, username, security, runner, view=None):
+        self.runner = runner  # Runs model calls off the Tk thread
         self.model = AccountModel()
         self.analytics_model = AnalyticsModel()
+        self.snapshot_scheduler = SnapshotScheduler(self.analytics_model, username)
         self.totp_model = TOTPModel()
         self.password_generator = PasswordGenerator()
         self.current_user_id = self._get_user_id(username)
         self.security = security
         self.logged_in_user = username
         self.view = view
+        self.page_boundaries = []  # last (account_name, account_id) of each page
+        self.changes_since = None  # high-water mark of the rows shown in the list
+        self.counted_ids = set()  # new rows already counted into an unloaded page
+        self.search_text = ''
+        self.search_results = None  # ranked rows while a search is active
         
     def _get_user_id(self, username):
         """Get or create user ID for username"""
         try:
-            query = """
-                INSERT INTO users (username)
-                VALUES (%s)
-                ON CONFLICT (username) DO UPDATE 
-                SET username = EXCLUDED.username
-                RETURNING user_id;
-            """
-            self.model.cur.execute(query, (username,))
-            self.model.conn.commit()
-            return self.model.cur.fetchone()[0]
+            return self.model.get_or_create_user_id(username)
         except Exception as e:
             print(f"Error getting user_id: {e}")
             return None
@@ -48,23 +49,124 @@ class AccountController:
     def save_account(self, data):
         """Save new account with owner"""
         # Data already contains owner_username from view
-        self.model.create_account(data)
+        self.runner.submit(
+            self.model.create_account, data,
+            on_success=lambda _: self._on_account_saved(),
+            on_error=lambda e: messagebox.showerror("Error", str(e))
+        )
+
+    def _on_account_saved(self):
         self.view.clear_form()
-        self.view.refresh_account_list()
+        self.view.current_account_id = None
+        self.refresh_changes()
+        self.snapshot_scheduler.request_snapshot()
+        messagebox.showinfo("Success", "Account saved successfully!")
         
     def refresh_account_list(self):
-        try:
-            accounts = self.model.get_accounts(self.security.logged_in_user)
-            self.view.tree.delete(*self.view.tree.get_children())
-            for account in accounts:
-                self.view.tree.insert('', 'end', values=(
-                    account[1],  # category
-                    account[2],  # account_name
-                    account[3],  # username
-                    account[5].strftime("%Y-%m-%d %H:%M")  # last_changed
-                ))
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to refresh accounts: {str(e)}")
+        """Reload the account list; a newer refresh supersedes this one"""
+        if self.search_text:
+            self.search_accounts(self.search_text)
+            return
+        self.search_results = None
+        self.runner.submit(
+            self.model.get_account_index, self.logged_in_user, Config.ACCOUNT_PAGE_SIZE,
+            key='account_list',
+            on_success=self._on_account_index_loaded,
+            on_error=lambda e: messagebox.showerror(
+                "Error", f"Failed to refresh accounts: {str(e)}")
+        )
+
+    def _on_account_index_loaded(self, result):
+        total, self.page_boundaries, self.changes_since = result
+        self.counted_ids.clear()
+        self.view.reset_account_list(total)
+
+    def refresh_changes(self):
+        """Patch the list with rows changed since the last load or refresh"""
+        if self.search_text or self.changes_since is None:
+            self.refresh_account_list()
+            return
+        self.runner.submit(
+            self.model.get_account_changes, self.logged_in_user, self.changes_since,
+            key='account_list',
+            on_success=self._on_account_changes,
+            on_error=lambda e: messagebox.showerror(
+                "Error", f"Failed to refresh accounts: {str(e)}")
+        )
+
+    def _page_for_key(self, key):
+        """Index of the page whose key range contains ``key``.
+
+        Python compares names by code point, the same order as the
+        COLLATE "C" keyset queries, so boundaries bisect correctly.
+        """
+        if not self.page_boundaries:
+            return 0
+        return min(bisect.bisect_left(self.page_boundaries, key), len(self.page_boundaries) - 1)
+
+    def _on_account_changes(self, result):
+        changed, deleted_ids, self.changes_since = result
+        account_list = self.view.account_list
+
+        # Rows in pages that are not loaded need no patching: the page is
+        # read fresh, and its length corrected, when it scrolls into view
+        for account_id in deleted_ids:
+            account_list.remove_row(account_id)
+
+        for row, is_new in changed:
+            account_id = row[0]
+            page = self._page_for_key((row[2], account_id))
+            current = account_list.find_row(account_id)
+            if current == page:
+                account_list.update_row(row)
+                continue
+            if current is not None:
+                # Renamed into another page's key range
+                account_list.remove_row(account_id)
+            if page in account_list.pages:
+                account_list.insert_row(page, row)
+            elif is_new and account_id not in self.counted_ids:
+                self.counted_ids.add(account_id)
+                account_list.insert_row(page, row)
+
+    def search_accounts(self, text):
+        """Show the ranked matches for ``text``, or the full list if it is empty"""
+        self.search_text = text.strip()
+        if not self.search_text:
+            self.refresh_account_list()
+            return
+        # Shares the list key so a search and a plain refresh supersede each other
+        self.runner.submit(
+            self.model.search_accounts, self.logged_in_user, self.search_text,
+            Config.SEARCH_RESULT_LIMIT,
+            key='account_list',
+            on_success=self._on_search_results,
+            on_error=lambda e: messagebox.showerror(
+                "Error", f"Search failed: {str(e)}")
+        )
+
+    def _on_search_results(self, rows):
+        self.search_results = rows
+        self.view.reset_account_list(len(rows))
+
+    def fetch_account_page(self, index):
+        """Load one keyset page of the account list into the view"""
+        if self.search_results is not None:
+            # Search results are already in memory; hand them over outside
+            # of the widget's render pass
+            start = index * Config.ACCOUNT_PAGE_SIZE
+            rows = self.search_results[start:start + Config.ACCOUNT_PAGE_SIZE]
+            self.view.after_idle(lambda: self.view.set_account_page(index, rows))
+            return
+
+        after = self.page_boundaries[index - 1] if index > 0 else None
+        upto = self.page_boundaries[index] if index < len(self.page_boundaries) - 1 else None
+        self.runner.submit(
+            self.model.get_accounts_page, self.logged_in_user, after, upto,
+            key=('account_page', index),
+            on_success=lambda rows: self.view.set_account_page(index, rows),
+            on_error=lambda e: print(f"Failed to load account page {index}: {e}")
+        )
 
     def check_password_expiry(self):
         try:
@@ -83,41 +185,92 @@ class AccountController:
         return self.model.get_accounts(self.logged_in_user)
 
     def load_account(self, account_id):
-        try:
-            account = self.model.get_account_by_id(account_id)
-            if account:
-                self.view.clear_form()
-                self.view.set_form_values(account)
-                # Update strength meter using stored strength
-                if 'password_strength' in account:
-                    self.view.strength_meter.update_strength(account['password_strength'])
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load account: {str(e)}")
+        # Only the most recent selection is shown
+        self.runner.submit(
+            self.model.get_account_by_id, account_id,
+            key='load_account',
+            on_success=self._on_account_loaded,
+            on_error=lambda e: messagebox.showerror(
+                "Error", f"Failed to load account: {str(e)}")
+        )
+
+    def fetch_encrypted_password(self, account_id, on_loaded):
+        """Load an account's ciphertext and pass it to ``on_loaded`` on the Tk thread"""
+        self.runner.submit(
+            self.model.get_encrypted_password, account_id,
+            key='encrypted_password',
+            on_success=on_loaded,
+            on_error=lambda e: messagebox.showerror(
+                "Error", f"Failed to get password: {str(e)}")
+        )
+
+    def reveal_password(self, account_id):
+        """Decrypt an account's password into the form after face verification"""
+        def on_loaded(encrypted_password):
+            if not encrypted_password:
+                messagebox.showerror("Error", "Failed to get password")
+                return
+            try:
+                password = self.view.with_face_preview(
+                    lambda canvas, status_label: self.security.decrypt_password(
+                        encrypted_password, canvas, status_label)
+                )
+            except PermissionError:
+                messagebox.showerror("Error", "Authentication required!")
+                return
+            if password is not None:
+                self.view.set_password(password)
+
+        self.fetch_encrypted_password(account_id, on_loaded)
+
+    def _on_account_loaded(self, account):
+        if account:
+            self.view.clear_form()
+            self.view.set_form_values(account)
+            # Update strength meter using stored strength
+            if 'password_strength' in account:
+                self.view.strength_meter.update_strength(account['password_strength'])
     
     def update_account(self, data):
         """Update account with owner"""
         # Ensure owner_username is included in update
         data['owner_username'] = self.logged_in_user
-        self.model.update_account(data)
-        self.view.clear_form()
-        self.view.refresh_account_list()
+        self.runner.submit(
+            self.model.update_account, data,
+            on_success=lambda _: self._on_account_saved(),
+            on_error=lambda e: messagebox.showerror("Error", str(e))
+        )
 
     def delete_account(self, account_id):
         try:
-            if not self.security.verify_image():
+            verified = self.view.with_face_preview(
+                lambda canvas, status_label: self.security.verify_image(
+                    canvas, status_label, operation='delete_account')
+            )
+            if verified is None:
+                return  # Another verification is still running
+            if not verified:
                 messagebox.showerror("Error", "Authentication required!")
                 return
                 
             if messagebox.askyesno("Confirm Delete", 
                                  "Are you sure you want to delete this account?"):
-                self.model.delete_account(account_id)
-                self.view.clear_form()
-                self.view.current_account_id = None
-                self.view.refresh_account_list()
-                messagebox.showinfo("Success", "Account deleted successfully!")
+                self.runner.submit(
+                    self.model.delete_account, account_id,
+                    on_success=lambda _: self._on_account_deleted(),
+                    on_error=lambda e: messagebox.showerror(
+                        "Error", f"Failed to delete account: {str(e)}")
+                )
         except Exception as e:
             messagebox.showerror("Error", f"Failed to delete account: {str(e)}")
 
+    def _on_account_deleted(self):
+        self.view.clear_form()
+        self.view.current_account_id = None
+        self.refresh_changes()
+        self.snapshot_scheduler.request_snapshot()
+        messagebox.showinfo("Success", "Account deleted successfully!")
+
     def show_password_generator(self):
         """Show password generator dialog"""
         from views.generator_view import PasswordGeneratorView
@@ -153,34 +306,47 @@ class AccountController:
         """Verify 2FA code"""
         return self.totp_model.verify_totp(self.current_user_id, code)
 
-    def refresh_analytics(self):
-        """Update analytics data"""
-        try:
-            stats = self.analytics_model.calculate_analytics(self.logged_in_user)
-            if not stats:
-                return
-                
-            history = self.analytics_model.get_historical_analytics(self.logged_in_user)
+    def _load_analytics(self, range_days):
+        """Fetch current stats and history; runs on a worker thread"""
+        stats = self.analytics_model.calculate_analytics(self.logged_in_user)
+        if not stats:
+            return None, []
+        start = datetime.now() - timedelta(days=range_days)
+        return stats, self.analytics_model.get_strength_history(self.logged_in_user, start)
+
+    def refresh_analytics(self, range_label=None):
+        """Update analytics data for the chart range named ``range_label``"""
+        range_days = Config.ANALYTICS_HISTORY_RANGES[range_label or Config.ANALYTICS_DEFAULT_RANGE]
+        self.runner.submit(
+            self._load_analytics, range_days,
+            key='analytics',
+            on_success=self._on_analytics_loaded,
+            on_error=lambda e: messagebox.showerror(
+                "Error", f"Failed to refresh analytics: {str(e)}")
+        )
+
+    def _on_analytics_loaded(self, result):
+        stats, history = result
+        if not stats:
+            return
             
-            # Update view with data
-            data = {
-                'total': stats[2],
-                'avg_strength': round(float(stats[3]), 1),
-                'weak': stats[4],
-                'medium': stats[5],
-                'strong': stats[6]
-            }
+        # Update view with data
+        data = {
+            'total': stats[2],
+            'avg_strength': round(float(stats[3]), 1),
+            'weak': stats[4],
+            'medium': stats[5],
+            'strong': stats[6]
+        }
+        
+        analytics_view = getattr(self.view, 'analytics_view', None)
+        if analytics_view is not None and analytics_view.winfo_exists():
+            analytics_view.update_stats(data)
             
-            if hasattr(self.view, 'analytics_view'):
-                self.view.analytics_view.update_stats(data)
-                
-                if history:
-                    dates = [h[0] for h in history]
-                    values = [float(h[1]) for h in history]
-                    self.view.analytics_view.plot_history(dates, values)
-                    
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to refresh analytics: {str(e)}")
+            if history:
+                dates = [h[0] for h in history]
+                values = [float(h[1]) for h in history]
+                analytics_view.plot_history(dates, values)
 
     def generate_password(self, preferences=None):
         """Generate password with given preferences"""
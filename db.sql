@@ -56,6 +56,9 @@ CREATE INDEX idx_accounts_category ON accounts(category_id);
 CREATE INDEX idx_password_history_account ON password_history(account_id);
 CREATE INDEX idx_reminders_account ON password_reminders(account_id);
 CREATE INDEX idx_accounts_owner ON accounts(owner_username);
+-- Keyset pagination of the account list; "C" collation so keys order the
+-- same way in Postgres and in Python
+CREATE INDEX idx_accounts_owner_name ON accounts(owner_username, account_name COLLATE "C", account_id);
 
 -- Insert default categories
 INSERT INTO categories (name, icon) VALUES 
@@ -31,3 +31,111 @@ CREATE TABLE password_preferences (
     avoid_similar BOOLEAN DEFAULT true,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+
+-- Per-owner password statistics, kept current by triggers on accounts so
+-- reading them is a primary-key lookup instead of a scan of the vault
+CREATE TABLE password_stats (
+    owner_username VARCHAR(50) PRIMARY KEY,
+    total_accounts INTEGER NOT NULL DEFAULT 0,
+    strength_sum BIGINT NOT NULL DEFAULT 0,      -- over non-zero strengths
+    strength_count INTEGER NOT NULL DEFAULT 0,   -- rows with a non-zero strength
+    weak_passwords INTEGER NOT NULL DEFAULT 0,   -- strength < 40
+    medium_passwords INTEGER NOT NULL DEFAULT 0, -- strength 40..70
+    strong_passwords INTEGER NOT NULL DEFAULT 0, -- strength > 70
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION password_stats_apply(
+    p_owner VARCHAR, p_strength INTEGER, p_sign INTEGER
+) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO password_stats AS s (
+        owner_username, total_accounts, strength_sum, strength_count,
+        weak_passwords, medium_passwords, strong_passwords
+    )
+    VALUES (
+        p_owner,
+        p_sign,
+        p_sign * COALESCE(NULLIF(p_strength, 0), 0),
+        p_sign * CASE WHEN COALESCE(p_strength, 0) <> 0 THEN 1 ELSE 0 END,
+        p_sign * CASE WHEN p_strength < 40 THEN 1 ELSE 0 END,
+        p_sign * CASE WHEN p_strength BETWEEN 40 AND 70 THEN 1 ELSE 0 END,
+        p_sign * CASE WHEN p_strength > 70 THEN 1 ELSE 0 END
+    )
+    ON CONFLICT (owner_username) DO UPDATE SET
+        total_accounts = s.total_accounts + EXCLUDED.total_accounts,
+        strength_sum = s.strength_sum + EXCLUDED.strength_sum,
+        strength_count = s.strength_count + EXCLUDED.strength_count,
+        weak_passwords = s.weak_passwords + EXCLUDED.weak_passwords,
+        medium_passwords = s.medium_passwords + EXCLUDED.medium_passwords,
+        strong_passwords = s.strong_passwords + EXCLUDED.strong_passwords,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION password_stats_sync() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM password_stats_apply(OLD.owner_username, OLD.password_strength, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM password_stats_apply(NEW.owner_username, NEW.password_strength, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_password_stats_insert_delete
+    AFTER INSERT OR DELETE ON accounts
+    FOR EACH ROW EXECUTE FUNCTION password_stats_sync();
+
+-- Updates only matter when they move a row between owners or buckets
+CREATE TRIGGER trg_password_stats_update
+    AFTER UPDATE OF owner_username, password_strength ON accounts
+    FOR EACH ROW
+    WHEN (OLD.owner_username IS DISTINCT FROM NEW.owner_username
+          OR OLD.password_strength IS DISTINCT FROM NEW.password_strength)
+    EXECUTE FUNCTION password_stats_sync();
+
+-- Backfill for vaults that existed before the triggers
+INSERT INTO password_stats (
+    owner_username, total_accounts, strength_sum, strength_count,
+    weak_passwords, medium_passwords, strong_passwords
+)
+SELECT
+    owner_username,
+    COUNT(*),
+    COALESCE(SUM(NULLIF(password_strength, 0)), 0),
+    COUNT(NULLIF(password_strength, 0)),
+    COUNT(CASE WHEN password_strength < 40 THEN 1 END),
+    COUNT(CASE WHEN password_strength BETWEEN 40 AND 70 THEN 1 END),
+    COUNT(CASE WHEN password_strength > 70 THEN 1 END)
+FROM accounts
+GROUP BY owner_username
+ON CONFLICT (owner_username) DO NOTHING;
+
+-- Latest-snapshot lookups for history charts and snapshot deduplication
+CREATE INDEX idx_password_analytics_owner_time ON password_analytics(owner_username, analyzed_at DESC);
+
+-- Time-bucketed rollups of password_analytics. Raw snapshots are folded
+-- into hourly buckets, hourly into daily and daily into weekly; each level
+-- is pruned after its retention period (see AnalyticsModel.compact_history)
+CREATE TABLE password_analytics_rollups (
+    owner_username VARCHAR(50) NOT NULL,
+    granularity VARCHAR(4) NOT NULL CHECK (granularity IN ('hour', 'day', 'week')),
+    bucket_start TIMESTAMP NOT NULL,
+    samples INTEGER NOT NULL,
+    strength_sum DECIMAL(12,2) NOT NULL,  -- sum of snapshot avg_strength
+    min_strength DECIMAL(5,2),
+    max_strength DECIMAL(5,2),
+    total_accounts INTEGER,               -- as of the last snapshot in the bucket
+    PRIMARY KEY (owner_username, granularity, bucket_start)
+);
+
+-- Single-row bookkeeping for the compaction job
+CREATE TABLE analytics_compaction_state (
+    id BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+    last_compacted_at TIMESTAMP NOT NULL
+);
+
+INSERT INTO analytics_compaction_state (last_compacted_at) VALUES ('-infinity');
@@ -0,0 +1,51 @@
+-- Change feed for incremental account list refreshes
+
+-- Every write to a column the feed returns bumps updated_at, whichever code
+-- path made it. Ciphertext-only rewrites (key rotation) are not changes a
+-- client can see, so they do not make every client re-read the vault.
+CREATE OR REPLACE FUNCTION touch_account_updated_at() RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_accounts_touch
+    BEFORE INSERT ON accounts
+    FOR EACH ROW EXECUTE FUNCTION touch_account_updated_at();
+
+CREATE TRIGGER trg_accounts_touch_update
+    BEFORE UPDATE ON accounts
+    FOR EACH ROW
+    WHEN ((OLD.category_id, OLD.account_name, OLD.username, OLD.last_password_change,
+           OLD.password_strength, OLD.owner_username)
+          IS DISTINCT FROM
+          (NEW.category_id, NEW.account_name, NEW.username, NEW.last_password_change,
+           NEW.password_strength, NEW.owner_username))
+    EXECUTE FUNCTION touch_account_updated_at();
+
+-- Tombstones so clients can learn which rows disappeared
+CREATE TABLE deleted_accounts (
+    account_id INTEGER PRIMARY KEY,
+    owner_username VARCHAR(50) NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT clock_timestamp()
+);
+
+CREATE INDEX idx_deleted_accounts_owner ON deleted_accounts(owner_username, deleted_at);
+
+CREATE OR REPLACE FUNCTION record_account_deletion() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO deleted_accounts (account_id, owner_username)
+    VALUES (OLD.account_id, OLD.owner_username)
+    ON CONFLICT (account_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at;
+    -- Tombstones only need to outlive the clients' refresh interval
+    DELETE FROM deleted_accounts WHERE deleted_at < clock_timestamp() - INTERVAL '1 day';
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_accounts_tombstone
+    AFTER DELETE ON accounts
+    FOR EACH ROW EXECUTE FUNCTION record_account_deletion();
+
+CREATE INDEX idx_accounts_owner_updated ON accounts(owner_username, updated_at);
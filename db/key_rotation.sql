@@ -0,0 +1,11 @@
+-- Progress of the key rotation job (see utils/key_rotation.py), one row per
+-- encrypted column. Written in the same transaction as each batch of
+-- re-encrypted rows, so an interrupted run resumes after the last commit
+CREATE TABLE key_rotation_state (
+    target VARCHAR(64) PRIMARY KEY,       -- table.column
+    key_version INTEGER NOT NULL,         -- version being rotated to
+    last_id INTEGER NOT NULL DEFAULT 0,   -- highest primary key processed
+    rows_rotated BIGINT NOT NULL DEFAULT 0,
+    completed_at TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
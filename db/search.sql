@@ -0,0 +1,20 @@
+-- Server-side account search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Searchable text kept in sync by Postgres itself
+ALTER TABLE accounts
+    ADD COLUMN search_text TEXT GENERATED ALWAYS AS (
+        lower(account_name || ' ' || username || ' ' ||
+              coalesce(url, '') || ' ' || coalesce(notes, ''))
+    ) STORED,
+    ADD COLUMN search_doc TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(account_name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(username, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(url, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(notes, '')), 'D')
+    ) STORED;
+
+-- Substring matches (LIKE '%term%') and similarity ranking
+CREATE INDEX idx_accounts_search_trgm ON accounts USING gin (search_text gin_trgm_ops);
+-- Whole-word / prefix matches
+CREATE INDEX idx_accounts_search_doc ON accounts USING gin (search_doc);
@@ -1,15 +1,18 @@
+from utils.startup_report import startup_report
+startup_report.install()  # Time the imports below
+
 import tkinter as tk
 from views.account_view import AccountView
 from views.login_view import LoginView
-from views.analytics_view import AnalyticsView  # Add new import
 from controllers.account_controller import AccountController
 from config import Config
 import threading
 import time
 from datetime import datetime, timedelta
 from tkinter import messagebox
-from utils.security import SecurityUtils
-import cv2
+from utils.services import services
+from utils.db_pool import ConnectionPool
+from utils.task_runner import TaskRunner
 
 class AuthenticationDialog(tk.Toplevel):
     def __init__(self, parent, security):
@@ -20,15 +23,22 @@ class AuthenticationDialog(tk.Toplevel):
         self.title("Authentication Required")
         self.geometry("300x150")
         
-        tk.Label(self, text="Please look at the camera for authentication").pack(pady=20)
-        tk.Button(self, text="Start Authentication", command=self.authenticate).pack()
+        self.status_label = tk.Label(self, text="Please look at the camera for authentication")
+        self.status_label.pack(pady=20)
+        self.start_button = tk.Button(self, text="Start Authentication", command=self.authenticate)
+        self.start_button.pack()
         
         self.protocol("WM_DELETE_WINDOW", self.on_close)
         self.transient(parent)
         self.grab_set()
     
     def authenticate(self):
-        if self.security.verify_image():
+        self.start_button.config(state=tk.DISABLED)
+        try:
+            verified = self.security.verify_image(status_label=self.status_label)
+        finally:
+            self.start_button.config(state=tk.NORMAL)
+        if verified:
             self.result = True
             self.destroy()
         else:
@@ -45,10 +55,25 @@ class Application(tk.Tk):
         self.title("Account Manager")
         self.geometry(Config.WINDOW_SIZE)
         
-        self.security = SecurityUtils()
+        self.security = services.get('security')
+        self.task_runner = TaskRunner(self)
+        
+        # Open pooled DB connections while the login screen is up
+        threading.Thread(target=self.warm_up_db_pool, daemon=True).start()
         
         # Show login
         self.show_login()
+        self.after_idle(self.on_login_window_shown)
+
+    def on_login_window_shown(self):
+        startup_report.mark("login window shown")
+        startup_report.finish()
+
+    def warm_up_db_pool(self):
+        try:
+            ConnectionPool.instance()
+        except Exception as e:
+            print(f"Database pool warm-up failed: {e}")
 
     def show_login(self):
         self.clear_window()
@@ -58,11 +83,12 @@ class Application(tk.Tk):
     def on_login_success(self, username):
         """Handle successful login"""
         self.clear_window()
-        self.controller = AccountController(username, self.security)
+        self.controller = AccountController(username, self.security, self.task_runner)
         self.account_view = AccountView(self, self.controller)
         self.controller.set_view(self.account_view)
         self.account_view.pack(fill=tk.BOTH, expand=True)
         self.schedule_password_checks()
+        self.controller.snapshot_scheduler.start()
 
     def clear_window(self):
         for widget in self.winfo_children():
@@ -94,6 +120,9 @@ class Application(tk.Tk):
 
     def show_analytics(self):
         try:
+            # Only needed once the analytics window is opened
+            from views.analytics_view import AnalyticsView
+            
             if hasattr(self, 'analytics_window'):
                 self.analytics_window.destroy()
                 
@@ -129,4 +158,20 @@ class Application(tk.Tk):
 if __name__ == "__main__":
     Config.init()
     app = Application()
-    app.mainloop()
+    try:
+        app.mainloop()
+    finally:
+        app.task_runner.shutdown()
+        controller = getattr(app, 'controller', None)
+        if controller is not None:
+            # Let a snapshot or compaction finish before its connection goes
+            controller.snapshot_scheduler.stop(timeout=Config.ANALYTICS_STOP_TIMEOUT)
+        ConnectionPool.close_instance()
+        camera = services.peek('camera')
+        if camera is not None:
+            camera.close()
+        crypto_engine = services.peek('crypto_engine')
+        if crypto_engine is not None:
+            crypto_engine.close()
+        if startup_report.enabled:
+            print(services.format_report())
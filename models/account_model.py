@@ -1,42 +1,55 @@
 from datetime import datetime, timedelta
-import psycopg2
+import re
 from config import Config
-from utils.security import SecurityUtils
+from utils.db_pool import ConnectionPool
+from utils.services import services
 
 class AccountModel:
     def __init__(self):
-        self.conn = psycopg2.connect(**Config.DB_CONFIG)
-        self.cur = self.conn.cursor()
-        self.security = SecurityUtils()
+        self.pool = ConnectionPool.instance()
+        self.security = services.get('security')
+
+    def get_or_create_user_id(self, username):
+        """Get or create user ID for username"""
+        query = """
+            INSERT INTO users (username)
+            VALUES (%s)
+            ON CONFLICT (username) DO UPDATE 
+            SET username = EXCLUDED.username
+            RETURNING user_id;
+        """
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(query, (username,))
+            user_id = cur.fetchone()[0]
+            conn.commit()
+            return user_id
 
     def create_account(self, data):
-        try:
-            encrypted_password = self.security.encrypt_password(data['password'])
-            query = """
-                INSERT INTO accounts 
-                (category_id, account_name, username, encrypted_password, url, 
-                password_strength, next_password_change, owner_username)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING account_id
-            """
-            next_change = datetime.now() + timedelta(days=Config.PASSWORD_EXPIRY_DAYS)
-            values = (
-                data['category_id'], 
-                data['account_name'],
-                data['username'],
-                encrypted_password,
-                data['url'],
-                data['password_strength'],
-                next_change,
-                data['owner_username']  # Ensure owner_username is included
-            )
-            self.cur.execute(query, values)
-            account_id = self.cur.fetchone()[0]
-            self.conn.commit()
+        encrypted_password = self.security.encrypt_password(data['password'])
+        query = """
+            INSERT INTO accounts 
+            (category_id, account_name, username, encrypted_password, url, 
+            password_strength, next_password_change, owner_username)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            RETURNING account_id
+        """
+        next_change = datetime.now() + timedelta(days=Config.PASSWORD_EXPIRY_DAYS)
+        values = (
+            data['category_id'], 
+            data['account_name'],
+            data['username'],
+            encrypted_password,
+            data['url'],
+            data['password_strength'],
+            next_change,
+            data['owner_username']  # Ensure owner_username is included
+        )
+        # The pool rolls back anything left uncommitted if execute raises
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(query, values)
+            account_id = cur.fetchone()[0]
+            conn.commit()
             return account_id
-        except Exception as e:
-            self.conn.rollback()
-            raise e
 
     def get_accounts(self, owner_username):
         """Get accounts filtered by owner"""
@@ -54,39 +67,194 @@ class AccountModel:
                 WHERE a.owner_username = %s
                 ORDER BY a.account_name
             """
-            self.cur.execute(query, (owner_username,))
-            return self.cur.fetchall()
+            with self.pool.connection() as conn, conn.cursor() as cur:
+                cur.execute(query, (owner_username,))
+                return cur.fetchall()
         except Exception as e:
             print(f"Error in get_accounts: {e}")
             return []
 
+    def get_account_index(self, owner_username, page_size):
+        """Return (total rows, page boundary keys, high-water mark) for the list.
+
+        ``boundaries[i]`` is the (account_name, account_id) of the last row of
+        page ``i``; page ``i`` holds the keys in
+        ``(boundaries[i - 1], boundaries[i]]``. Only the keys and category_id
+        are read, never the row payload; category_id stands in for the
+        categories join of the page queries, which the foreign key makes
+        equivalent to it being set. The high-water mark is the starting point
+        for ``get_account_changes``.
+        """
+        query = """
+            SELECT account_name, account_id, total
+            FROM (
+                SELECT
+                    a.account_name,
+                    a.account_id,
+                    row_number() OVER (ORDER BY a.account_name COLLATE "C", a.account_id) AS rn,
+                    COUNT(*) OVER () AS total
+                FROM accounts a
+                WHERE a.owner_username = %s AND a.category_id IS NOT NULL
+            ) keys
+            WHERE rn %% %s = 0 OR rn = total
+            ORDER BY rn
+        """
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT now()")
+            high_water = cur.fetchone()[0]
+            cur.execute(query, (owner_username, page_size))
+            rows = cur.fetchall()
+        if not rows:
+            return 0, [], high_water
+        return rows[-1][2], [(name, account_id) for name, account_id, _ in rows], high_water
+
+    def get_accounts_page(self, owner_username, after=None, upto=None):
+        """Get the accounts with keys in ``(after, upto]``, ordered by key.
+
+        Keys are (account_name, account_id); None leaves that end open.
+        Names compare under the "C" collation (code point order), which is
+        how the client orders keys too.
+        """
+        query = """
+            SELECT
+                a.account_id,
+                c.name as category,
+                a.account_name,
+                a.username,
+                COALESCE(to_char(a.last_password_change, 'YYYY-MM-DD HH24:MI'), 'Never'),
+                a.password_strength
+            FROM accounts a
+            JOIN categories c ON a.category_id = c.category_id
+            WHERE a.owner_username = %s
+            {keyset}
+            ORDER BY a.account_name COLLATE "C", a.account_id
+        """
+        conditions = []
+        params = [owner_username]
+        if after is not None:
+            conditions.append('AND (a.account_name COLLATE "C", a.account_id) > (%s, %s)')
+            params.extend(after)
+        if upto is not None:
+            conditions.append('AND (a.account_name COLLATE "C", a.account_id) <= (%s, %s)')
+            params.extend(upto)
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(query.format(keyset=" ".join(conditions)), params)
+            return cur.fetchall()
+
+    def get_account_changes(self, owner_username, since):
+        """Rows written and ids deleted since the ``since`` high-water mark.
+
+        Returns ``(changed, deleted_ids, high_water)`` where ``changed`` is a
+        list of ``(row, is_new)`` in the same row shape as
+        ``get_accounts_page``. The window reaches back
+        Config.CHANGE_FEED_OVERLAP_SECONDS before ``since`` so writes from
+        transactions that committed late are not missed; applying a change
+        twice is harmless.
+        """
+        query = """
+            SELECT
+                a.account_id,
+                c.name as category,
+                a.account_name,
+                a.username,
+                COALESCE(to_char(a.last_password_change, 'YYYY-MM-DD HH24:MI'), 'Never'),
+                a.password_strength,
+                a.created_at > %(since)s - make_interval(secs => %(overlap)s) AS is_new
+            FROM accounts a
+            JOIN categories c ON a.category_id = c.category_id
+            WHERE a.owner_username = %(owner)s
+              AND a.updated_at > %(since)s - make_interval(secs => %(overlap)s)
+            ORDER BY a.account_name COLLATE "C", a.account_id
+        """
+        deleted_query = """
+            SELECT account_id FROM deleted_accounts
+            WHERE owner_username = %(owner)s
+              AND deleted_at > %(since)s - make_interval(secs => %(overlap)s)
+        """
+        params = {
+            'owner': owner_username,
+            'since': since,
+            'overlap': Config.CHANGE_FEED_OVERLAP_SECONDS,
+        }
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT now()")
+            high_water = cur.fetchone()[0]
+            cur.execute(query, params)
+            changed = [(row[:-1], row[-1]) for row in cur.fetchall()]
+            cur.execute(deleted_query, params)
+            deleted_ids = [row[0] for row in cur.fetchall()]
+        return changed, deleted_ids, high_water
+
+    def search_accounts(self, owner_username, text, limit=200):
+        """Ranked search over account name, username, URL and notes.
+
+        Uses the trigram and full-text indexes from db/search.sql: a row
+        matches if it contains ``text`` as a substring or every word of it as
+        a word prefix. Best matches come first.
+        """
+        term = text.strip().lower()
+        if not term:
+            return []
+        # Escape LIKE wildcards so they match literally
+        pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        words = re.findall(r'\w+', term)
+        prefix_query = ' & '.join(f"{word}:*" for word in words) if words else None
+
+        query = """
+            SELECT
+                a.account_id,
+                c.name as category,
+                a.account_name,
+                a.username,
+                COALESCE(to_char(a.last_password_change, 'YYYY-MM-DD HH24:MI'), 'Never'),
+                a.password_strength
+            FROM accounts a
+            JOIN categories c ON a.category_id = c.category_id
+            WHERE a.owner_username = %(owner)s
+              AND (a.search_text LIKE %(pattern)s
+                   OR a.search_doc @@ to_tsquery('simple', %(prefix)s))
+            ORDER BY
+                COALESCE(ts_rank(a.search_doc, to_tsquery('simple', %(prefix)s)), 0)
+                + word_similarity(%(term)s, a.search_text) DESC,
+                a.account_name, a.account_id
+            LIMIT %(limit)s
+        """
+        params = {
+            'owner': owner_username,
+            'pattern': pattern,
+            'prefix': prefix_query,
+            'term': term,
+            'limit': limit,
+        }
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(query, params)
+            return cur.fetchall()
+
     def get_expiring_passwords(self, days=7):
-        try:
-            query = """
-                SELECT * FROM accounts 
-                WHERE next_password_change <= %s
-                AND next_password_change >= CURRENT_TIMESTAMP
-            """
-            expiry_date = datetime.now() + timedelta(days=days)
-            self.cur.execute(query, (expiry_date,))
-            return self.cur.fetchall()
-        except Exception as e:
-            raise e
+        query = """
+            SELECT * FROM accounts 
+            WHERE next_password_change <= %s
+            AND next_password_change >= CURRENT_TIMESTAMP
+        """
+        expiry_date = datetime.now() + timedelta(days=days)
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(query, (expiry_date,))
+            return cur.fetchall()
 
     def update_password(self, account_id, new_password):
-        try:
+        encrypted_password = self.security.encrypt_password(new_password)
+        next_change = datetime.now() + timedelta(days=Config.PASSWORD_EXPIRY_DAYS)
+
+        with self.pool.connection() as conn, conn.cursor() as cur:
             # Store old password in history
-            self.cur.execute(
+            cur.execute(
                 "INSERT INTO password_history (account_id, encrypted_password) "
                 "SELECT account_id, encrypted_password FROM accounts WHERE account_id = %s",
                 (account_id,)
             )
             
             # Update with new password
-            encrypted_password = self.security.encrypt_password(new_password)
-            next_change = datetime.now() + timedelta(days=Config.PASSWORD_EXPIRY_DAYS)
-            
-            self.cur.execute("""
+            cur.execute("""
                 UPDATE accounts 
                 SET encrypted_password = %s,
                     last_password_change = CURRENT_TIMESTAMP,
@@ -95,15 +263,13 @@ class AccountModel:
                 WHERE account_id = %s
             """, (encrypted_password, next_change, account_id))
             
-            self.conn.commit()
-        except Exception as e:
-            self.conn.rollback()
-            raise e
+            conn.commit()
 
     def get_categories(self):
         try:
-            self.cur.execute("SELECT category_id, name, icon FROM categories ORDER BY name")
-            categories = self.cur.fetchall()
+            with self.pool.connection() as conn, conn.cursor() as cur:
+                cur.execute("SELECT category_id, name, icon FROM categories ORDER BY name")
+                categories = cur.fetchall()
             # Return tuple of (display_text, category_id)
             return [(f"{cat[1]}", cat[0]) for cat in categories]
         except Exception as e:
@@ -111,6 +277,11 @@ class AccountModel:
             return []
 
     def get_account_by_id(self, account_id):
+        """Account metadata for the form; the password is never read or decrypted here.
+
+        Use get_encrypted_password, and decrypt only when the user asks for
+        the secret, so browsing the list never opens the camera.
+        """
         try:
             query = """
                 SELECT 
@@ -118,76 +289,73 @@ class AccountModel:
                     a.account_name,
                     a.username,
                     a.url,
-                    a.encrypted_password,
                     a.password_strength
                 FROM accounts a 
                 JOIN categories c ON a.category_id = c.category_id
                 WHERE a.account_id = %s
             """
-            self.cur.execute(query, (account_id,))
-            result = self.cur.fetchone()
+            with self.pool.connection() as conn, conn.cursor() as cur:
+                cur.execute(query, (account_id,))
+                result = cur.fetchone()
             if result:
-                decrypted_password = None
-                try:
-                    # Only decrypt if fingerprint verification succeeds
-                    decrypted_password = self.security.decrypt_password(result[4])
-                except:
-                    pass
-                    
                 return {
                     'category': result[0],
                     'account_name': result[1],
                     'username': result[2],
                     'url': result[3],
-                    'password': decrypted_password,
-                    'password_strength': result[5]
+                    'password_strength': result[4]
                 }
             return None
         except Exception as e:
             print(f"Error fetching account: {e}")
             return None
 
-    def update_account(self, data):
-        try:
-            encrypted_password = self.security.encrypt_password(data['password'])
-            query = """
-                UPDATE accounts 
-                SET category_id = %s,
-                    account_name = %s,
-                    username = %s,
-                    encrypted_password = %s,
-                    url = %s,
-                    password_strength = %s,
-                    updated_at = CURRENT_TIMESTAMP,
-                    owner_username = %s
-                WHERE account_id = %s
-                AND owner_username = %s  -- Add owner check for security
-            """
-            values = (
-                data['category_id'],
-                data['account_name'],
-                data['username'],
-                encrypted_password,
-                data['url'],
-                data['password_strength'],
-                data['owner_username'],
-                data['account_id'],
-                data['owner_username']
+    def get_encrypted_password(self, account_id):
+        """Stored ciphertext for one account, or None if it does not exist"""
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "SELECT encrypted_password FROM accounts WHERE account_id = %s",
+                (account_id,)
             )
-            self.cur.execute(query, values)
-            self.conn.commit()
-        except Exception as e:
-            self.conn.rollback()
-            raise e
+            result = cur.fetchone()
+        return result[0] if result else None
+
+    def update_account(self, data):
+        """Update account fields; an empty password keeps the stored one"""
+        # The form is loaded without the secret, so a blank password field
+        # means "unchanged" rather than "clear it"
+        encrypted_password = (
+            self.security.encrypt_password(data['password']) if data.get('password') else None
+        )
+        query = """
+            UPDATE accounts 
+            SET category_id = %s,
+                account_name = %s,
+                username = %s,
+                encrypted_password = COALESCE(%s, encrypted_password),
+                url = %s,
+                password_strength = COALESCE(%s, password_strength),
+                updated_at = CURRENT_TIMESTAMP,
+                owner_username = %s
+            WHERE account_id = %s
+            AND owner_username = %s  -- Add owner check for security
+        """
+        values = (
+            data['category_id'],
+            data['account_name'],
+            data['username'],
+            encrypted_password,
+            data['url'],
+            data['password_strength'] if encrypted_password else None,
+            data['owner_username'],
+            data['account_id'],
+            data['owner_username']
+        )
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(query, values)
+            conn.commit()
     
     def delete_account(self, account_id):
-        try:
-            self.cur.execute("DELETE FROM accounts WHERE account_id = %s", (account_id,))
-            self.conn.commit()
-        except Exception as e:
-            self.conn.rollback()
-            raise e
-
-    def __del__(self):
-        self.cur.close()
-        self.conn.close()
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM accounts WHERE account_id = %s", (account_id,))
+            conn.commit()
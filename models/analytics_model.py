@@ -1,59 +1,258 @@
-from datetime import datetime
-import psycopg2
+import math
+from datetime import datetime, timedelta
 from config import Config
+from utils.db_pool import ConnectionPool
 
 class AnalyticsModel:
+    # Rollup levels, finest first; each is folded from the one before it
+    ROLLUP_LEVELS = (
+        ('hour', timedelta(hours=1)),
+        ('day', timedelta(days=1)),
+        ('week', timedelta(weeks=1)),
+    )
+    # Arbitrary fixed key so only one client compacts at a time
+    COMPACTION_LOCK_ID = 7291001
+
+    # Current stats for one owner from the trigger-maintained password_stats
+    STATS_QUERY = """
+        SELECT
+            COALESCE(s.total_accounts, 0) as total,
+            COALESCE(s.strength_sum::numeric / NULLIF(s.strength_count, 0), 0) as avg_strength,
+            COALESCE(s.weak_passwords, 0) as weak,
+            COALESCE(s.medium_passwords, 0) as medium,
+            COALESCE(s.strong_passwords, 0) as strong
+        FROM (SELECT %(owner)s::varchar AS owner_username) o
+        LEFT JOIN password_stats s ON s.owner_username = o.owner_username
+    """
+
     def __init__(self):
-        self.conn = psycopg2.connect(**Config.DB_CONFIG)
-        self.cur = self.conn.cursor()
+        self.pool = ConnectionPool.instance()
 
     def calculate_analytics(self, owner_username):
-        """Calculate password analytics for user"""
+        """Current password analytics for user, without writing a snapshot.
+
+        Returns a row shaped like password_analytics:
+        (analytics_id, owner, total, avg_strength, weak, medium, strong)
+        with analytics_id None.
+        """
         try:
-            query = """
-                WITH stats AS (
-                    SELECT 
-                        COUNT(*) as total,
-                        COALESCE(AVG(NULLIF(password_strength, 0)), 0) as avg_strength,
-                        COUNT(CASE WHEN password_strength < 40 THEN 1 END) as weak,
-                        COUNT(CASE WHEN password_strength BETWEEN 40 AND 70 THEN 1 END) as medium,
-                        COUNT(CASE WHEN password_strength > 70 THEN 1 END) as strong
-                    FROM accounts
-                    WHERE owner_username = %s
-                )
-                INSERT INTO password_analytics 
-                (owner_username, total_accounts, avg_strength, 
-                 weak_passwords, medium_passwords, strong_passwords)
-                SELECT %s, total, avg_strength, weak, medium, strong
-                FROM stats
-                RETURNING *;
-            """
-            self.cur.execute(query, (owner_username, owner_username))
-            result = self.cur.fetchone()
-            self.conn.commit()
-            
-            if not result:
-                # Return default values if no data
-                return (None, owner_username, 0, 0.0, 0, 0, 0)
-            return result
-            
+            with self.pool.connection() as conn, conn.cursor() as cur:
+                cur.execute(self.STATS_QUERY, {'owner': owner_username})
+                total, avg_strength, weak, medium, strong = cur.fetchone()
+            return (None, owner_username, total, avg_strength, weak, medium, strong)
+
         except Exception as e:
-            self.conn.rollback()
             print(f"Analytics calculation error: {e}")
             return None
 
+    def take_snapshot(self, owner_username, min_interval):
+        """Record a history row unless one is recent or the stats are unchanged.
+
+        At most one snapshot per owner is written every ``min_interval``
+        seconds, and only when the stats differ from the latest snapshot.
+        Returns the new analytics_id, or None if nothing was written.
+        """
+        query = """
+            WITH stats AS (""" + self.STATS_QUERY + """),
+            latest AS (
+                SELECT total_accounts, avg_strength, weak_passwords,
+                       medium_passwords, strong_passwords, analyzed_at
+                FROM password_analytics
+                WHERE owner_username = %(owner)s
+                ORDER BY analyzed_at DESC
+                LIMIT 1
+            )
+            INSERT INTO password_analytics
+            (owner_username, total_accounts, avg_strength,
+             weak_passwords, medium_passwords, strong_passwords)
+            SELECT %(owner)s, total, avg_strength, weak, medium, strong
+            FROM stats
+            WHERE NOT EXISTS (
+                SELECT 1 FROM latest
+                WHERE latest.analyzed_at > CURRENT_TIMESTAMP - make_interval(secs => %(interval)s)
+                   OR (latest.total_accounts, latest.avg_strength, latest.weak_passwords,
+                       latest.medium_passwords, latest.strong_passwords)
+                      = (stats.total, round(stats.avg_strength, 2), stats.weak,
+                         stats.medium, stats.strong)
+            )
+            RETURNING analytics_id;
+        """
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            # Serialise snapshots per owner across every running client
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (owner_username,))
+            cur.execute(query, {'owner': owner_username, 'interval': min_interval})
+            result = cur.fetchone()
+            conn.commit()
+        return result[0] if result else None
+
     def get_historical_analytics(self, owner_username, limit=30):
         """Get historical analytics data"""
         query = """
-            SELECT analyzed_at, avg_strength 
+            SELECT analyzed_at, avg_strength
             FROM password_analytics
             WHERE owner_username = %s
             ORDER BY analyzed_at DESC
             LIMIT %s
         """
-        self.cur.execute(query, (owner_username, limit))
-        return self.cur.fetchall()
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(query, (owner_username, limit))
+            return cur.fetchall()
+
+    def compact_history(self):
+        """Fold snapshots into hourly/daily/weekly rollups and apply retention.
+
+        Buckets are recomputed from the level below, starting at the bucket
+        that held the previous run's watermark, so the job is idempotent and
+        only touches recent data. Returns False if another client is already
+        compacting.
+        """
+        fold_raw = """
+            INSERT INTO password_analytics_rollups AS r
+            (owner_username, granularity, bucket_start, samples, strength_sum,
+             min_strength, max_strength, total_accounts)
+            SELECT
+                owner_username, 'hour', date_trunc('hour', analyzed_at),
+                COUNT(*), SUM(avg_strength), MIN(avg_strength), MAX(avg_strength),
+                (array_agg(total_accounts ORDER BY analyzed_at DESC))[1]
+            FROM password_analytics
+            WHERE analyzed_at >= date_trunc('hour', %(since)s)
+              AND analyzed_at <= %(watermark)s
+            GROUP BY owner_username, date_trunc('hour', analyzed_at)
+            ON CONFLICT (owner_username, granularity, bucket_start) DO UPDATE SET
+                samples = EXCLUDED.samples,
+                strength_sum = EXCLUDED.strength_sum,
+                min_strength = EXCLUDED.min_strength,
+                max_strength = EXCLUDED.max_strength,
+                total_accounts = EXCLUDED.total_accounts
+        """
+        fold_rollup = """
+            INSERT INTO password_analytics_rollups AS r
+            (owner_username, granularity, bucket_start, samples, strength_sum,
+             min_strength, max_strength, total_accounts)
+            SELECT
+                owner_username, %(target)s, date_trunc(%(target)s, bucket_start),
+                SUM(samples), SUM(strength_sum), MIN(min_strength), MAX(max_strength),
+                (array_agg(total_accounts ORDER BY bucket_start DESC))[1]
+            FROM password_analytics_rollups
+            WHERE granularity = %(source)s
+              AND bucket_start >= date_trunc(%(target)s, %(since)s)
+            GROUP BY owner_username, date_trunc(%(target)s, bucket_start)
+            ON CONFLICT (owner_username, granularity, bucket_start) DO UPDATE SET
+                samples = EXCLUDED.samples,
+                strength_sum = EXCLUDED.strength_sum,
+                min_strength = EXCLUDED.min_strength,
+                max_strength = EXCLUDED.max_strength,
+                total_accounts = EXCLUDED.total_accounts
+        """
+        # Each level is cut on a boundary of the level above it, so every
+        # bucket that may still be recomputed keeps all of its sources
+        prune = """
+            DELETE FROM password_analytics
+            WHERE analyzed_at < date_trunc('hour', %(watermark)s - make_interval(days => %(raw_days)s));
+            DELETE FROM password_analytics_rollups
+            WHERE granularity = 'hour'
+              AND bucket_start < date_trunc('day', %(watermark)s - make_interval(days => %(hour_days)s));
+            DELETE FROM password_analytics_rollups
+            WHERE granularity = 'day'
+              AND bucket_start < date_trunc('week', %(watermark)s - make_interval(days => %(day_days)s));
+        """
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (self.COMPACTION_LOCK_ID,))
+            if not cur.fetchone()[0]:
+                return False
+            cur.execute("SELECT last_compacted_at, now() FROM analytics_compaction_state FOR UPDATE")
+            since, watermark = cur.fetchone()
+
+            params = {'since': since, 'watermark': watermark}
+            cur.execute(fold_raw, params)
+            for (source, _), (target, _) in zip(self.ROLLUP_LEVELS, self.ROLLUP_LEVELS[1:]):
+                cur.execute(fold_rollup, dict(params, source=source, target=target))
+
+            cur.execute(prune, {
+                'watermark': watermark,
+                'raw_days': Config.ANALYTICS_RAW_RETENTION_DAYS,
+                'hour_days': Config.ANALYTICS_HOURLY_RETENTION_DAYS,
+                'day_days': Config.ANALYTICS_DAILY_RETENTION_DAYS,
+            })
+            cur.execute(
+                "UPDATE analytics_compaction_state SET last_compacted_at = %s",
+                (watermark,)
+            )
+            conn.commit()
+        return True
+
+    def pick_granularity(self, start, end, max_points=None):
+        """(granularity, stride) keeping ``start``..``end`` within ``max_points``
+
+        ``granularity`` is the finest rollup level that fits, or None when raw
+        snapshots are sparse enough to plot directly. ``stride`` is how many
+        buckets of that level are merged into each point; it is only above 1
+        when even the coarsest level would give too many.
+        """
+        max_points = max_points or Config.ANALYTICS_CHART_POINTS
+        span = end - start
+        raw_spacing = timedelta(seconds=Config.ANALYTICS_SNAPSHOT_INTERVAL)
+        if span / raw_spacing <= max_points:
+            return None, 1
+        for granularity, size in self.ROLLUP_LEVELS:
+            if span / size <= max_points:
+                return granularity, 1
+        granularity, size = self.ROLLUP_LEVELS[-1]
+        return granularity, math.ceil(span / size / max_points)
+
+    def get_strength_history(self, owner_username, start, end=None, max_points=None):
+        """(time, avg_strength) points covering ``start``..``end``, oldest first.
 
-    def __del__(self):
-        self.cur.close()
-        self.conn.close()
+        The bucket size is chosen from the range so the result never exceeds
+        roughly ``max_points`` rows regardless of how much history exists;
+        past the coarsest rollup level, consecutive buckets are merged.
+        Rolled-up buckets are merged with raw snapshots taken since the last
+        compaction, so recent points show up before the job next runs.
+        """
+        end = end or datetime.now()
+        granularity, stride = self.pick_granularity(start, end, max_points)
+        width = None
+        if granularity is None:
+            query = """
+                SELECT analyzed_at, avg_strength
+                FROM password_analytics
+                WHERE owner_username = %(owner)s
+                  AND analyzed_at BETWEEN %(start)s AND %(end)s
+                ORDER BY analyzed_at
+            """
+        else:
+            # Points are ``width`` seconds wide, counted from the bucket holding ``start``
+            width = stride * dict(self.ROLLUP_LEVELS)[granularity].total_seconds()
+            query = """
+                WITH state AS (SELECT last_compacted_at FROM analytics_compaction_state),
+                origin AS (SELECT date_trunc(%(granularity)s, %(start)s::timestamp) AS origin),
+                buckets AS (
+                    SELECT bucket_start, samples, strength_sum
+                    FROM password_analytics_rollups
+                    WHERE owner_username = %(owner)s
+                      AND granularity = %(granularity)s
+                      AND bucket_start BETWEEN date_trunc(%(granularity)s, %(start)s) AND %(end)s
+                    UNION ALL
+                    SELECT date_trunc(%(granularity)s, analyzed_at), 1, avg_strength
+                    FROM password_analytics, state
+                    WHERE owner_username = %(owner)s
+                      AND analyzed_at > state.last_compacted_at
+                      AND analyzed_at BETWEEN %(start)s AND %(end)s
+                )
+                SELECT origin + floor(extract(epoch FROM bucket_start - origin) / %(width)s)::int
+                           * make_interval(secs => %(width)s) AS point,
+                       SUM(strength_sum) / SUM(samples)
+                FROM buckets, origin
+                GROUP BY point
+                ORDER BY point
+            """
+        params = {
+            'owner': owner_username,
+            'granularity': granularity,
+            'width': width,
+            'start': start,
+            'end': end,
+        }
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(query, params)
+            return cur.fetchall()
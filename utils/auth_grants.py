@@ -0,0 +1,56 @@
+import threading
+import time
+
+
+class AuthGrantManager:
+    """Short-lived authorisations issued after a successful face verification.
+
+    A grant lets one user perform a fixed set of operations until it
+    expires, so a run of sensitive actions needs a single camera check
+    instead of one each. Hit and miss counters show how often the camera
+    was skipped.
+    """
+
+    def __init__(self, ttl, operations):
+        self.ttl = ttl
+        self.operations = frozenset(operations)
+        self._grants = {}  # username -> (expires_at, operations)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def issue(self, username, operations=None, ttl=None):
+        """Grant ``username`` the given operations (default: all grantable)"""
+        if not username or (ttl or self.ttl) <= 0:
+            return
+        expires_at = time.monotonic() + (ttl or self.ttl)
+        ops = self.operations if operations is None else self.operations & frozenset(operations)
+        with self._lock:
+            self._grants[username] = (expires_at, ops)
+
+    def check(self, username, operation):
+        """True if a live grant lets ``username`` perform ``operation``"""
+        with self._lock:
+            grant = self._grants.get(username)
+            if grant is not None and grant[0] <= time.monotonic():
+                del self._grants[username]
+                grant = None
+            if grant is not None and operation in grant[1]:
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def revoke(self, username=None):
+        """Drop one user's grant, or every grant"""
+        with self._lock:
+            if username is None:
+                self._grants.clear()
+            else:
+                self._grants.pop(username, None)
+
+    def stats(self):
+        with self._lock:
+            active = sum(1 for expires_at, _ in self._grants.values()
+                         if expires_at > time.monotonic())
+            return {'hits': self.hits, 'misses': self.misses, 'active_grants': active}
@@ -0,0 +1,143 @@
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from utils.services import _rss_bytes
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def percentile(sorted_values, pct):
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def peak_rss_bytes():
+    """High-water resident memory of this process so far"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux reports KiB
+
+
+class StageBenchmark:
+    """Times one pipeline stage over a list of inputs.
+
+    ``run`` makes a timing pass (after warm-up) and then a shorter pass
+    under tracemalloc for peak allocations, so tracing overhead never
+    shows up in the latencies. NumPy buffers are traced, so OpenCV's
+    output arrays are included; memory held inside OpenCV itself is only
+    visible in the process RSS figures.
+    """
+
+    PERCENTILES = (50, 90, 95, 99)
+
+    def __init__(self, name, fn, warmup=5, memory_iterations=20):
+        self.name = name
+        self.fn = fn
+        self.warmup = warmup
+        self.memory_iterations = memory_iterations
+
+    def run(self, inputs, iterations):
+        for i in range(min(self.warmup, iterations)):
+            self.fn(inputs[i % len(inputs)])
+
+        rss_before = _rss_bytes()
+        timings = []
+        started = time.perf_counter()
+        for i in range(iterations):
+            item = inputs[i % len(inputs)]
+            t0 = time.perf_counter()
+            self.fn(item)
+            timings.append(time.perf_counter() - t0)
+        wall = time.perf_counter() - started
+        rss_after = _rss_bytes()
+
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        for i in range(min(self.memory_iterations, iterations)):
+            self.fn(inputs[i % len(inputs)])
+        peak = tracemalloc.get_traced_memory()[1] - base
+        if not tracing:
+            tracemalloc.stop()
+
+        timings.sort()
+        result = {
+            'stage': self.name,
+            'iterations': iterations,
+            'fps': iterations / wall if wall > 0 else None,
+            'mean_ms': sum(timings) / len(timings) * 1000,
+            'min_ms': timings[0] * 1000,
+            'max_ms': timings[-1] * 1000,
+            'peak_python_bytes': peak,
+            'rss_delta_bytes': (rss_after - rss_before)
+            if rss_before is not None and rss_after is not None else None,
+        }
+        for pct in self.PERCENTILES:
+            result[f'p{pct}_ms'] = percentile(timings, pct) * 1000
+        return result
+
+
+def environment_info(**extra):
+    info = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+    info.update(extra)
+    return info
+
+
+def write_results(path, results):
+    """Write a results document as JSON, creating the directory if needed"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, default=str)
+
+
+def compare_results(baseline, current, metric='p50_ms'):
+    """Per-stage change in ``metric`` between two results documents"""
+    before = {stage['stage']: stage for stage in baseline.get('stages', [])}
+    changes = []
+    for stage in current.get('stages', []):
+        old = before.get(stage['stage'])
+        if old is None or not old.get(metric) or stage.get(metric) is None:
+            continue
+        changes.append((stage['stage'], old[metric], stage[metric],
+                        (stage[metric] - old[metric]) / old[metric] * 100))
+    return changes
+
+
+def format_results(results, baseline=None):
+    lines = [f"{'stage':<12} {'p50':>8} {'p95':>8} {'p99':>8} {'fps':>8} {'peak py':>10}"]
+    for stage in results['stages']:
+        lines.append(
+            f"{stage['stage']:<12} {stage['p50_ms']:7.2f}ms {stage['p95_ms']:7.2f}ms "
+            f"{stage['p99_ms']:7.2f}ms {stage['fps']:8.1f} {stage['peak_python_bytes'] / 1024:8.0f}KiB"
+        )
+    peak = results['environment'].get('peak_rss_bytes')
+    if peak:
+        lines.append(f"process peak RSS {peak / (1024 * 1024):.1f} MiB")
+    if baseline is not None:
+        lines.append("change in p50 against baseline")
+        for name, old, new, pct in compare_results(baseline, results):
+            lines.append(f"  {name:<12} {old:7.2f}ms -> {new:7.2f}ms  ({pct:+.1f}%)")
+    return "\n".join(lines)
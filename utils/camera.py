@@ -0,0 +1,193 @@
+import collections
+import threading
+import time
+from config import Config
+from utils.frame_sources import create_frame_source
+
+
+class CameraService:
+    """Owns the capture device and keeps it warm between uses.
+
+    The device is any FrameSource (live camera, recorded video or replayed
+    stills, see utils.frame_sources), so the same code runs headless. A
+    producer thread reads frames into a small ring buffer while anyone is
+    subscribed, and for ``idle_timeout`` seconds after the last subscriber
+    leaves, so back-to-back previews and verifications reuse the open device
+    instead of paying the open cost each time. Frames in the buffer are
+    shared between subscribers and marked read-only; copy before drawing.
+    """
+
+    def __init__(self, source=None, buffer_frames=None, idle_timeout=None):
+        self.source = source  # Frame source spec, or a callable returning a FrameSource
+        self.idle_timeout = Config.CAMERA_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        self._frames = collections.deque(maxlen=buffer_frames or Config.CAMERA_BUFFER_FRAMES)
+        self._cond = threading.Condition()
+        self._device_lock = threading.Lock()  # Held for the lifetime of one open device
+        self._state = 'closed'  # closed -> opening -> open | failed
+        self._thread = None
+        self._subscribers = 0
+        self._idle_since = time.monotonic()
+        self._seq = 0
+        self._closing = False
+        self._opens = 0
+        self._last_open_ms = None
+
+    def subscribe(self):
+        """Start (or keep) the device running and return a subscription"""
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("CameraService has been closed")
+            self._subscribers += 1
+            if self._thread is None:
+                self._start_producer()
+        return CameraSubscription(self)
+
+    def _start_producer(self):
+        # Caller holds _cond
+        self._state = 'opening'
+        self._thread = threading.Thread(target=self._run, name='camera-producer', daemon=True)
+        self._thread.start()
+
+    def _unsubscribe(self):
+        with self._cond:
+            self._subscribers -= 1
+            if self._subscribers == 0:
+                self._idle_since = time.monotonic()
+
+    def _open_device(self):
+        source = self.source() if callable(self.source) else create_frame_source(self.source)
+        if not source.open():
+            source.release()
+            return None
+        return source
+
+    def _run(self):
+        # A previous producer may still be releasing the device
+        with self._device_lock:
+            started = time.perf_counter()
+            source = self._open_device()
+            with self._cond:
+                self._last_open_ms = (time.perf_counter() - started) * 1000
+                if source is None:
+                    self._state = 'failed'
+                    self._thread = None
+                    self._cond.notify_all()
+                    return
+                self._opens += 1
+                self._state = 'open'
+                self._cond.notify_all()
+
+            failures = 0
+            try:
+                while True:
+                    with self._cond:
+                        idle = (self._subscribers == 0 and
+                                time.monotonic() - self._idle_since >= self.idle_timeout)
+                        if self._closing or idle:
+                            break
+                    ret, frame = source.read()
+                    if not ret:
+                        failures += 1
+                        if failures >= Config.CAMERA_MAX_READ_FAILURES:
+                            break
+                        continue
+                    failures = 0
+                    frame.flags.writeable = False
+                    with self._cond:
+                        self._seq += 1
+                        self._frames.append((self._seq, time.monotonic(), frame))
+                        self._cond.notify_all()
+            finally:
+                with self._cond:
+                    self._frames.clear()
+                    healthy = failures < Config.CAMERA_MAX_READ_FAILURES
+                    if self._subscribers > 0 and not self._closing and healthy:
+                        # Subscribed after the idle check but before this point saw
+                        # _thread still set; hand over to a producer that waits for
+                        # the device lock below
+                        self._start_producer()
+                    else:
+                        # Cleared under the lock so a new subscriber starts a fresh producer
+                        self._state = 'closed'
+                        self._thread = None
+                    self._cond.notify_all()
+                source.release()
+
+    def _wait_open(self, timeout):
+        with self._cond:
+            self._cond.wait_for(lambda: self._state != 'opening', timeout)
+            return self._state == 'open'
+
+    def _next_frame(self, after_seq, timeout):
+        """Newest frame with a sequence number above ``after_seq``"""
+        def ready():
+            return (self._frames and self._frames[-1][0] > after_seq) or \
+                self._state not in ('opening', 'open')
+
+        with self._cond:
+            self._cond.wait_for(ready, timeout)
+            if self._frames and self._frames[-1][0] > after_seq:
+                return self._frames[-1]
+            return None
+
+    def recent(self, count=None):
+        """Up to ``count`` buffered frames, oldest first"""
+        with self._cond:
+            frames = [frame for _, _, frame in self._frames]
+        return frames if count is None else frames[-count:]
+
+    def stats(self):
+        with self._cond:
+            return {
+                'state': self._state,
+                'subscribers': self._subscribers,
+                'frames_captured': self._seq,
+                'device_opens': self._opens,
+                'last_open_ms': self._last_open_ms,
+            }
+
+    def close(self):
+        """Stop the producer and release the device"""
+        with self._cond:
+            self._closing = True
+            thread = self._thread
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join(timeout=Config.CAMERA_READ_TIMEOUT)
+
+
+class CameraSubscription:
+    """One consumer's view of the shared camera; stands in for a VideoCapture"""
+
+    def __init__(self, service):
+        self.service = service
+        self._last_seq = 0
+        self._released = False
+
+    def is_opened(self, timeout=None):
+        """Wait for the device to open and report whether it did"""
+        return self.service._wait_open(Config.CAMERA_READ_TIMEOUT if timeout is None else timeout)
+
+    def read(self, timeout=None):
+        """(ret, frame) for the newest frame this subscriber has not seen yet"""
+        if self._released:
+            return False, None
+        entry = self.service._next_frame(
+            self._last_seq, Config.CAMERA_READ_TIMEOUT if timeout is None else timeout
+        )
+        if entry is None:
+            return False, None
+        self._last_seq = entry[0]
+        return True, entry[2]
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.service._unsubscribe()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
@@ -0,0 +1,178 @@
+import base64
+import collections
+import itertools
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from config import Config
+from utils.key_ring import KeyRing
+
+
+class FernetCipher:
+    """Fernet (AES-128-CBC + HMAC-SHA256); the format stored in the vault"""
+
+    name = 'fernet'
+
+    def __init__(self, key):
+        from cryptography.fernet import Fernet
+        self._fernet = Fernet(key)
+
+    def encrypt(self, plaintext):
+        return self._fernet.encrypt(plaintext.encode()).decode()
+
+    def decrypt(self, token):
+        return self._fernet.decrypt(token.encode()).decode()
+
+
+class AesGcmCipher:
+    """AES-GCM with a random 96-bit nonce; tokens are urlsafe base64 of nonce + ciphertext"""
+
+    name = 'aesgcm'
+    NONCE_SIZE = 12
+
+    def __init__(self, key):
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        self._aead = AESGCM(key)
+
+    def encrypt(self, plaintext):
+        nonce = os.urandom(self.NONCE_SIZE)
+        sealed = self._aead.encrypt(nonce, plaintext.encode(), None)
+        return base64.urlsafe_b64encode(nonce + sealed).decode()
+
+    def decrypt(self, token):
+        raw = base64.urlsafe_b64decode(token.encode())
+        return self._aead.decrypt(raw[:self.NONCE_SIZE], raw[self.NONCE_SIZE:], None).decode()
+
+
+CIPHERS = {
+    FernetCipher.name: FernetCipher,
+    AesGcmCipher.name: AesGcmCipher,
+    'keyring': KeyRing.from_spec,  # key is a KeyRing.spec
+    'keyfile': KeyRing.load,  # key is a key file path; follows changes to it
+}
+
+
+def make_cipher(name, key):
+    return CIPHERS[name](key)
+
+
+# Per-process cipher, built once by the pool initializer
+_worker_cipher = None
+
+
+def _init_worker(cipher_name, key):
+    global _worker_cipher
+    _worker_cipher = make_cipher(cipher_name, key)
+
+
+def _encrypt_chunk(chunk):
+    return [_worker_cipher.encrypt(text) for text in chunk]
+
+
+def _decrypt_chunk(chunk):
+    return [_worker_cipher.decrypt(token) for token in chunk]
+
+
+def _reencrypt(cipher, value):
+    if isinstance(value, list):  # e.g. a TEXT[] column
+        return [cipher.reencrypt(token) for token in value]
+    return cipher.reencrypt(value)
+
+
+def _reencrypt_chunk(chunk):
+    return [_reencrypt(_worker_cipher, value) for value in chunk]
+
+
+def chunked(items, size):
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class CryptoEngine:
+    """Bulk encryption and decryption across a process pool.
+
+    ``encrypt_many`` and ``decrypt_many`` take any iterable (it is consumed
+    lazily) and yield results in input order. Work is sent to the pool in
+    chunks of ``chunk_size`` and at most ``max_pending`` chunks are in
+    flight, so memory stays bounded however long the input is and a slow
+    consumer holds back the producer. Inputs that fit in one chunk are
+    handled in-process, where a pool round trip would cost more than it
+    saves.
+
+    By default tokens go through the app's key file, so they carry its
+    version prefix and stay readable after a rotation; ``key`` is then the
+    file's path and every worker loads its own ring from it, re-reading
+    the file when a key is added while the app runs. The key is handed to
+    each worker explicitly, since a spawned worker would not see keys
+    loaded or added in this process. With the 'keyring' cipher ``key`` is
+    a fixed KeyRing.spec instead, as the rotation jobs use.
+    """
+
+    def __init__(self, key=None, cipher='keyring', workers=None, chunk_size=None, max_pending=None):
+        if key is None:
+            if cipher not in ('keyring', 'keyfile'):
+                raise ValueError(f"The {cipher} cipher needs an explicit key")
+            from utils.services import services
+            key, cipher = services.get('key_ring').path, 'keyfile'
+        self.key = key
+        self.cipher_name = cipher
+        self.cipher = make_cipher(cipher, self.key)
+        self.workers = workers or Config.CRYPTO_WORKERS
+        self.chunk_size = chunk_size or Config.CRYPTO_CHUNK_SIZE
+        self.max_pending = max_pending or Config.CRYPTO_MAX_PENDING_CHUNKS
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(self.cipher_name, self.key),
+                )
+            return self._pool
+
+    def encrypt(self, plaintext):
+        return self.cipher.encrypt(plaintext)
+
+    def decrypt(self, token):
+        return self.cipher.decrypt(token)
+
+    def encrypt_many(self, plaintexts):
+        return self._map(_encrypt_chunk, self.cipher.encrypt, plaintexts)
+
+    def decrypt_many(self, tokens):
+        return self._map(_decrypt_chunk, self.cipher.decrypt, tokens)
+
+    def reencrypt_many(self, values):
+        """Tokens (or lists of tokens) moved to the current key; needs a key ring cipher"""
+        return self._map(_reencrypt_chunk, lambda value: _reencrypt(self.cipher, value), values)
+
+    def _map(self, chunk_fn, one_fn, items):
+        chunks = chunked(items, self.chunk_size)
+        head = list(itertools.islice(chunks, 2))
+        if len(head) < 2 or self.workers <= 1:
+            for chunk in itertools.chain(head, chunks):
+                for item in chunk:
+                    yield one_fn(item)
+            return
+
+        pool = self._get_pool()
+        pending = collections.deque()
+        for chunk in itertools.chain(head, chunks):
+            if len(pending) >= self.max_pending:
+                yield from pending.popleft().result()
+            pending.append(pool.submit(chunk_fn, chunk))
+        while pending:
+            yield from pending.popleft().result()
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,175 @@
+import threading
+import time
+from contextlib import contextmanager
+import psycopg2
+from psycopg2 import extensions, pool as pg_pool
+from config import Config
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection frees up within the configured wait"""
+
+
+class ConnectionPool:
+    """Process-wide PostgreSQL connection pool shared by all models.
+
+    Models borrow a connection per operation through ``connection()`` and give
+    it back as soon as the operation finishes, so the number of server
+    sessions is bounded by ``Config.DB_POOL_MAX`` no matter how many
+    controllers are alive.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, minconn, maxconn, timeout, health_check_interval, **db_config):
+        self._pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, **db_config)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_checked = {}  # id(conn) -> monotonic time of last health check
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._stats = {
+            'checkouts': 0,
+            'in_use': 0,
+            'peak_in_use': 0,
+            'timeouts': 0,
+            'health_check_failures': 0,
+            'total_wait': 0.0,
+            'max_wait': 0.0,
+        }
+
+    @classmethod
+    def instance(cls):
+        """Return the shared pool, creating it from Config on first use"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(
+                        Config.DB_POOL_MIN,
+                        Config.DB_POOL_MAX,
+                        Config.DB_POOL_TIMEOUT,
+                        Config.DB_POOL_HEALTH_CHECK_INTERVAL,
+                        **Config.DB_CONFIG
+                    )
+        return cls._instance
+
+    @classmethod
+    def close_instance(cls):
+        """Close every connection of the shared pool"""
+        with cls._instance_lock:
+            if cls._instance is not None:
+                cls._instance.closeall()
+                cls._instance = None
+
+    def getconn(self):
+        """Borrow a healthy connection, waiting at most ``timeout`` seconds"""
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise PoolTimeoutError(
+                f"No database connection available after {self.timeout}s "
+                f"({self.maxconn} in use)"
+            )
+
+        try:
+            conn = self._ensure_healthy(self._pool.getconn())
+        except Exception:
+            self._slots.release()
+            raise
+
+        waited = time.monotonic() - start
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['in_use'] += 1
+            self._stats['peak_in_use'] = max(self._stats['peak_in_use'], self._stats['in_use'])
+            self._stats['total_wait'] += waited
+            self._stats['max_wait'] = max(self._stats['max_wait'], waited)
+        return conn
+
+    def putconn(self, conn):
+        """Return a borrowed connection, discarding it if it is broken"""
+        close = bool(conn.closed)
+        if not close and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            # Never hand a half-finished transaction to the next borrower
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                close = True
+
+        if close:
+            self._last_checked.pop(id(conn), None)
+        try:
+            self._pool.putconn(conn, close=close)
+        finally:
+            with self._lock:
+                self._stats['in_use'] -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a ``with`` block.
+
+        Uncommitted work is rolled back when the block exits, so callers only
+        need to ``commit()`` on success.
+        """
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def _ensure_healthy(self, conn):
+        """Replace ``conn`` if it is closed or fails a periodic ``SELECT 1``.
+
+        The replacement is probed too; if it also fails the database is
+        taken to be unreachable and OperationalError is raised.
+        """
+        now = time.monotonic()
+        last = self._last_checked.get(id(conn), 0.0)
+        if not conn.closed and now - last < self.health_check_interval:
+            return conn
+
+        if not self._probe(conn):
+            conn = self._pool.getconn()
+            if not self._probe(conn):
+                raise psycopg2.OperationalError(
+                    "Database unreachable: a fresh connection failed its health check"
+                )
+
+        self._last_checked[id(conn)] = now
+        return conn
+
+    def _probe(self, conn):
+        """Run ``SELECT 1`` on ``conn``; a failing connection is closed and dropped"""
+        try:
+            if conn.closed:
+                raise psycopg2.InterfaceError("connection already closed")
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            with self._lock:
+                self._stats['health_check_failures'] += 1
+            self._last_checked.pop(id(conn), None)
+            self._pool.putconn(conn, close=True)
+            return False
+
+    def stats(self):
+        """Snapshot of pool usage counters"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['max_size'] = self.maxconn
+        stats['avg_wait_ms'] = (
+            stats['total_wait'] / stats['checkouts'] * 1000 if stats['checkouts'] else 0.0
+        )
+        stats['max_wait_ms'] = stats.pop('max_wait') * 1000
+        del stats['total_wait']
+        return stats
+
+    def closeall(self):
+        self._pool.closeall()
+        self._last_checked.clear()
@@ -3,65 +3,85 @@ import face_recognition
 import numpy as np
 import os
 from config import Config
+from utils.services import services
+from utils.face_index import FaceEncodingIndex
 
 class FaceAuthenticator:
-    def __init__(self):
-        self.known_face_encodings = []
+    def __init__(self, camera=None):
+        # Any CameraService, e.g. one replaying recorded frames
+        self.camera = camera or services.get('camera')
+        self.index = FaceEncodingIndex(os.path.join(Config.BASE_DIR, 'faces'))
         self.load_known_faces()
         
-    def load_known_faces(self):
-        faces_dir = os.path.join(Config.BASE_DIR, 'faces')
-        os.makedirs(faces_dir, exist_ok=True)
+    @property
+    def known_face_encodings(self):
+        """Memory-mapped (faces x 128) matrix of enrolled encodings"""
+        return self.index.encodings
         
-        for face_file in os.listdir(faces_dir):
-            if face_file.endswith('.jpg'):
-                image = face_recognition.load_image_file(
-                    os.path.join(faces_dir, face_file)
-                )
-                encoding = face_recognition.face_encodings(image)[0]
-                self.known_face_encodings.append(encoding)
+    def load_known_faces(self):
+        """Map the persisted encodings, then encode only new or changed images"""
+        self.index.load()
+        self.index.refresh()
     
     def register_face(self):
-        cap = cv2.VideoCapture(0)
+        cap = self.camera.subscribe()
         while True:
             ret, frame = cap.read()
             cv2.imshow('Register Face - Press SPACE when ready', frame)
             
             if cv2.waitKey(1) & 0xFF == 32:  # SPACE key
-                face_locations = face_recognition.face_locations(frame)
+                # face_recognition expects RGB, like the images it loads from disk
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                face_locations = face_recognition.face_locations(rgb)
                 if face_locations:
-                    encoding = face_recognition.face_encodings(frame)[0]
-                    face_path = os.path.join(Config.BASE_DIR, 'faces', 
-                                           f'user_face_{len(self.known_face_encodings)}.jpg')
-                    cv2.imwrite(face_path, frame)
-                    self.known_face_encodings.append(encoding)
+                    encoding = face_recognition.face_encodings(rgb, face_locations)[0]
+                    face_name = f'user_face_{len(self.known_face_encodings)}.jpg'
+                    cv2.imwrite(os.path.join(self.index.faces_dir, face_name), frame)
+                    self.index.add(face_name, encoding)
                     break
                 
         cap.release()
         cv2.destroyAllWindows()
         return True
     
-    def verify_face(self):
-        if not self.known_face_encodings:
-            return False
-            
-        cap = cv2.VideoCapture(0)
-        for _ in range(30):  # Try for 30 frames
-            ret, frame = cap.read()
-            cv2.imshow('Verify Face', frame)
-            cv2.waitKey(1)
+    def nearest_face(self, encoding):
+        """(enrolled face name, distance) closest to ``encoding``.
+
+        One vectorised distance computation over the whole encoding matrix,
+        so the cost per frame barely grows with the number of enrolled faces.
+        """
+        known = self.known_face_encodings
+        if not len(known):
+            return None, float('inf')
+        distances = np.linalg.norm(known - encoding, axis=1)
+        best = int(np.argmin(distances))
+        return os.path.splitext(self.index.names[best])[0], float(distances[best])
+    
+    def identify_face(self):
+        """Name of the enrolled face in front of the camera, or None"""
+        if not len(self.known_face_encodings):
+            return None
             
-            face_locations = face_recognition.face_locations(frame)
-            if face_locations:
-                encoding = face_recognition.face_encodings(frame)[0]
-                matches = face_recognition.compare_faces(
-                    self.known_face_encodings, encoding
-                )
-                if any(matches):
-                    cap.release()
-                    cv2.destroyAllWindows()
-                    return True
-                    
-        cap.release()
-        cv2.destroyAllWindows()
-        return False
+        cap = self.camera.subscribe()
+        try:
+            for _ in range(30):  # Try for 30 frames
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                cv2.imshow('Verify Face', frame)
+                cv2.waitKey(1)
+                
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                face_locations = face_recognition.face_locations(rgb)
+                if face_locations:
+                    encoding = face_recognition.face_encodings(rgb, face_locations)[0]
+                    name, distance = self.nearest_face(encoding)
+                    if distance <= Config.FACE_RECOGNITION_TOLERANCE:
+                        return name
+        finally:
+            cap.release()
+            cv2.destroyAllWindows()
+        return None
+    
+    def verify_face(self):
+        return self.identify_face() is not None
@@ -0,0 +1,92 @@
+from config import Config
+from utils.lazy_import import lazy_import
+from utils.services import services
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+
+class FaceTracker:
+    """Haar cascade face detection that avoids scanning the whole frame.
+
+    Full scans run on a copy of the frame downscaled by ``scale``. Once a
+    face is found, following frames only search a region of interest
+    around the last face, widened by ``roi_margin`` of the face size on
+    each side. A full scan runs again when the ROI loses the face, and at
+    least every ``full_scan_interval`` frames so a second face entering the
+    picture is still seen. Boxes are always in full-frame coordinates.
+
+    With mode 'full' every frame gets a full scan at ``scale``; mode 'full'
+    with a scale of 1.0 is the original whole-frame detector.
+    """
+
+    def __init__(self, mode=None, scale=None, roi_margin=None, full_scan_interval=None,
+                 min_size=None):
+        self.mode = mode or Config.FACE_DETECT_MODE
+        self.scale = scale or Config.FACE_DETECT_SCALE
+        self.roi_margin = Config.FACE_ROI_MARGIN if roi_margin is None else roi_margin
+        self.full_scan_interval = full_scan_interval or Config.FACE_FULL_SCAN_INTERVAL
+        self.min_size = min_size or Config.FACE_MIN_SIZE
+        self._last_box = None
+        self._frames_since_scan = 0
+        self.full_scans = 0
+        self.roi_scans = 0
+
+    @property
+    def cascade(self):
+        return services.get('face_detector')
+
+    def reset(self):
+        """Forget the tracked face, e.g. when the frame source changes"""
+        self._last_box = None
+        self._frames_since_scan = 0
+
+    def detect(self, gray):
+        """Face boxes (x, y, w, h) in a grayscale frame"""
+        if (self.mode == 'tracked' and self._last_box is not None
+                and self._frames_since_scan < self.full_scan_interval):
+            faces = self._detect_roi(gray, self._last_box)
+            if len(faces):
+                self._frames_since_scan += 1
+                self._last_box = self._largest(faces)
+                return faces
+
+        faces = self._detect_scaled(gray, 0, 0)
+        self.full_scans += 1
+        self._frames_since_scan = 0
+        self._last_box = self._largest(faces) if len(faces) else None
+        return faces
+
+    def _detect_roi(self, gray, box):
+        x, y, w, h = box
+        height, width = gray.shape[:2]
+        x0 = max(0, int(x - w * self.roi_margin))
+        y0 = max(0, int(y - h * self.roi_margin))
+        x1 = min(width, int(x + w * (1 + self.roi_margin)))
+        y1 = min(height, int(y + h * (1 + self.roi_margin)))
+        self.roi_scans += 1
+        return self._detect_scaled(gray[y0:y1, x0:x1], x0, y0)
+
+    def _detect_scaled(self, gray, offset_x, offset_y):
+        """Run the cascade on ``gray`` shrunk by ``scale`` and map boxes back"""
+        scale = self.scale
+        image = gray if scale == 1.0 else cv2.resize(
+            gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+        )
+        faces = self.cascade.detectMultiScale(
+            image, scaleFactor=1.1, minNeighbors=5,
+            minSize=(max(1, int(self.min_size[0] * scale)), max(1, int(self.min_size[1] * scale)))
+        )
+        if len(faces) == 0:
+            return np.empty((0, 4), dtype=int)
+        faces = (np.asarray(faces, dtype=float) / scale).astype(int)
+        faces[:, 0] += offset_x
+        faces[:, 1] += offset_y
+        return faces
+
+    @staticmethod
+    def _largest(faces):
+        return tuple(max(faces, key=lambda f: f[2] * f[3]))
+
+    def stats(self):
+        return {'full_scans': self.full_scans, 'roi_scans': self.roi_scans}
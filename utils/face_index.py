@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from config import Config
+from utils.lazy_import import lazy_import
+
+np = lazy_import('numpy')
+
+ENCODING_SIZE = 128  # face_recognition embeddings are 128 floats
+
+
+def file_digest(path):
+    """SHA-1 of a file's contents"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode_face_file(path):
+    """First face encoding in an image file, or None if it has no face.
+
+    Module level so it can run in a worker process.
+    """
+    import face_recognition
+    image = face_recognition.load_image_file(path)
+    encodings = face_recognition.face_encodings(image)
+    return encodings[0] if encodings else None
+
+
+class FaceEncodingIndex:
+    """Face encodings for a directory of images, persisted between runs.
+
+    Encodings live in one ``.npy`` matrix that is memory-mapped on load;
+    a JSON manifest maps each image to its row, keyed by modification time,
+    size and content hash. Images without a face are kept in the manifest
+    with no row, so they are not encoded again on every refresh. ``refresh``
+    re-encodes only images that are new or whose contents changed (a touched
+    but identical file just has its manifest entry updated), in a process
+    pool when there is more than one, and rewrites the store atomically.
+    """
+
+    MANIFEST = 'manifest.json'
+    MATRIX = 'encodings.npy'
+
+    def __init__(self, faces_dir, index_dir=None, workers=None):
+        self.faces_dir = faces_dir
+        self.index_dir = index_dir or os.path.join(faces_dir, '.index')
+        self.workers = workers or Config.FACE_INDEX_WORKERS
+        self.entries = {}  # file name -> {'sha1', 'mtime_ns', 'size', 'row' (None: no face)}
+        self.names = []  # file names in row order, faces only
+        self.encodings = np.empty((0, ENCODING_SIZE))
+        self._lock = threading.Lock()
+        self.encoded = 0  # images encoded by the last refresh
+
+    def load(self):
+        """Map the persisted store; returns False if there is none yet"""
+        manifest_path = os.path.join(self.index_dir, self.MANIFEST)
+        matrix_path = os.path.join(self.index_dir, self.MATRIX)
+        try:
+            with open(manifest_path) as f:
+                entries = json.load(f)['entries']
+            encodings = np.load(matrix_path, mmap_mode='r')
+        except (OSError, ValueError, KeyError):
+            return False
+        names = sorted((name for name, entry in entries.items() if entry['row'] is not None),
+                       key=lambda name: entries[name]['row'])
+        if encodings.ndim != 2 or len(encodings) != len(names):
+            return False  # Torn or foreign store; refresh rebuilds it
+        with self._lock:
+            self.entries = entries
+            self.names = names
+            self.encodings = encodings
+        return True
+
+    def refresh(self):
+        """Bring the index in line with the images on disk; returns True if it changed"""
+        os.makedirs(self.faces_dir, exist_ok=True)
+        with self._lock:
+            current = {}
+            pending = []  # (name, stat, sha1) needing an encoding
+            changed = False
+            for name in sorted(os.listdir(self.faces_dir)):
+                if not name.endswith('.jpg'):
+                    continue
+                path = os.path.join(self.faces_dir, name)
+                stat = os.stat(path)
+                entry = self.entries.get(name)
+                if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                    current[name] = dict(entry)
+                    continue
+                sha1 = file_digest(path)
+                if entry and entry['sha1'] == sha1:
+                    current[name] = dict(entry, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                else:
+                    pending.append((name, stat, sha1))
+                changed = True
+            changed = changed or len(current) != len(self.entries)
+
+            rows = [np.asarray(self.encodings[entry['row']])
+                    for entry in current.values() if entry['row'] is not None]
+            for (name, stat, sha1), encoding in zip(pending, self._encode(pending)):
+                current[name] = {'sha1': sha1, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+                                 'row': None}
+                if encoding is None:
+                    print(f"No face found in {name}, skipping")
+                    continue
+                current[name]['row'] = len(rows)
+                rows.append(encoding)
+            self.encoded = len(pending)
+
+            if not changed:
+                return False
+            matrix = np.array(rows, dtype=np.float64).reshape(-1, ENCODING_SIZE)
+            names = self._number_rows(current)
+            self._save(current, matrix)
+            self.entries = current
+            self.names = names
+            self.encodings = np.load(os.path.join(self.index_dir, self.MATRIX), mmap_mode='r')
+            return True
+
+    @staticmethod
+    def _number_rows(entries):
+        """Renumber rows of entries with a face in manifest order; returns their names"""
+        names = []
+        for name, entry in entries.items():
+            if entry['row'] is not None:
+                entry['row'] = len(names)
+                names.append(name)
+        return names
+
+    def _encode(self, pending):
+        paths = [os.path.join(self.faces_dir, name) for name, _, _ in pending]
+        if len(paths) <= 1 or self.workers <= 1:
+            return [encode_face_file(path) for path in paths]
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(paths))) as pool:
+            return list(pool.map(encode_face_file, paths))
+
+    def _save(self, entries, matrix):
+        """Write matrix then manifest, each via rename so readers never see half a file"""
+        os.makedirs(self.index_dir, exist_ok=True)
+        matrix_path = os.path.join(self.index_dir, self.MATRIX)
+        with open(matrix_path + '.tmp', 'wb') as f:
+            np.save(f, matrix)
+        os.replace(matrix_path + '.tmp', matrix_path)
+
+        manifest_path = os.path.join(self.index_dir, self.MANIFEST)
+        with open(manifest_path + '.tmp', 'w') as f:
+            json.dump({'encoding_size': ENCODING_SIZE, 'entries': entries}, f)
+        os.replace(manifest_path + '.tmp', manifest_path)
+
+    def add(self, name, encoding):
+        """Record the encoding of an image just written to the faces directory"""
+        path = os.path.join(self.faces_dir, name)
+        stat = os.stat(path)
+        with self._lock:
+            entries = {key: dict(value) for key, value in self.entries.items() if key != name}
+            rows = [np.asarray(self.encodings[entry['row']])
+                    for entry in entries.values() if entry['row'] is not None]
+            entries[name] = {'sha1': file_digest(path), 'mtime_ns': stat.st_mtime_ns,
+                             'size': stat.st_size, 'row': len(rows)}
+            rows.append(np.asarray(encoding, dtype=np.float64))
+            names = self._number_rows(entries)
+            self._save(entries, np.array(rows).reshape(-1, ENCODING_SIZE))
+            self.entries = entries
+            self.names = names
+            self.encodings = np.load(os.path.join(self.index_dir, self.MATRIX), mmap_mode='r')
@@ -0,0 +1,201 @@
+import collections
+import os
+import time
+from config import Config
+from utils.lazy_import import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+
+class FaceMatcher:
+    """Scores a detected face against a user's reference template.
+
+    The live face is cropped with a small margin, resized so the face
+    matches the template size and histogram-equalised the same way as the
+    reference, then compared with normalised cross-correlation. The margin
+    lets the template slide a few pixels to absorb detector jitter. The
+    coarsest pyramid level is compared first, and a clearly different face
+    is scored there without touching the full-size crop.
+    """
+
+    def __init__(self, search_margin=None, coarse_reject=None):
+        self.search_margin = Config.FACE_MATCH_SEARCH_MARGIN if search_margin is None else search_margin
+        self.coarse_reject = Config.FACE_MATCH_COARSE_REJECT if coarse_reject is None else coarse_reject
+
+    def _search_region(self, gray, box, size):
+        """Face crop plus margin, scaled so the face itself is ``size``"""
+        x, y, w, h = box
+        mx, my = int(w * self.search_margin), int(h * self.search_margin)
+        height, width = gray.shape[:2]
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(width, x + w + mx), min(height, y + h + my)
+        scale_x, scale_y = size[0] / w, size[1] / h
+        target = (max(size[0], int((x1 - x0) * scale_x)), max(size[1], int((y1 - y0) * scale_y)))
+        region = cv2.resize(gray[y0:y1, x0:x1], target, interpolation=cv2.INTER_AREA)
+        return cv2.equalizeHist(region)
+
+    def score(self, gray, box, template):
+        """Similarity in [-1, 1] between the face at ``box`` and ``template``"""
+        coarse = template.pyramid[-1]
+        coarse_region = self._search_region(gray, box, coarse.shape[::-1])
+        coarse_score = float(np.max(cv2.matchTemplate(coarse_region, coarse, cv2.TM_CCOEFF_NORMED)))
+        if coarse_score < self.coarse_reject:
+            return coarse_score
+
+        region = self._search_region(gray, box, template.face.shape[::-1])
+        return float(np.max(cv2.matchTemplate(region, template.face, cv2.TM_CCOEFF_NORMED)))
+
+    def session(self, **limits):
+        return MatchSession(**limits)
+
+
+class MatchSession:
+    """Accumulates per-frame scores for one verification and decides early.
+
+    The decision uses the mean of the last ``window`` scores. Once at least
+    ``min_frames`` faces have been scored, a mean at or above ``accept``
+    accepts and a mean at or below ``reject`` rejects. A session that is
+    still undecided after ``max_frames`` frames or ``timeout`` seconds is
+    rejected. ``decision_ms`` is the time from the start of the session to
+    the decision.
+    """
+
+    def __init__(self, accept=None, reject=None, window=None, min_frames=None,
+                 max_frames=None, timeout=None):
+        self.accept = accept or Config.FACE_MATCH_ACCEPT
+        self.reject = Config.FACE_MATCH_REJECT if reject is None else reject
+        self.min_frames = min_frames or Config.FACE_MATCH_MIN_FRAMES
+        self.max_frames = max_frames or Config.FACE_MATCH_MAX_FRAMES
+        self.timeout = timeout or Config.FACE_MATCH_TIMEOUT
+        self.scores = collections.deque(maxlen=window or Config.FACE_MATCH_WINDOW)
+        self.frames = 0
+        self.scored = 0
+        self.decision = None  # 'accept' or 'reject'
+        self.decision_ms = None
+        self._started = time.perf_counter()
+
+    @property
+    def confidence(self):
+        return sum(self.scores) / len(self.scores) if self.scores else 0.0
+
+    def add(self, score=None):
+        """Record one frame (``score`` None when no face was found) and return the decision"""
+        if self.decision is not None:
+            return self.decision
+        self.frames += 1
+        if score is not None:
+            self.scored += 1
+            self.scores.append(score)
+
+        if self.scored >= self.min_frames:
+            if self.confidence >= self.accept:
+                return self._decide('accept')
+            if self.confidence <= self.reject:
+                return self._decide('reject')
+        if self.frames >= self.max_frames or self.elapsed() >= self.timeout:
+            return self._decide('reject')
+        return None
+
+    def elapsed(self):
+        return time.perf_counter() - self._started
+
+    def give_up(self):
+        """Reject an undecided session, e.g. when the camera stops delivering"""
+        if self.decision is None:
+            self._decide('reject')
+
+    def _decide(self, decision):
+        self.decision = decision
+        self.decision_ms = self.elapsed() * 1000
+        return decision
+
+    def result(self):
+        return {
+            'decision': self.decision,
+            'confidence': self.confidence,
+            'frames': self.frames,
+            'scored_frames': self.scored,
+            'decision_ms': self.decision_ms,
+        }
+
+
+class FaceGallery:
+    """Every enrolled user's face in one matrix, for 1:N identification.
+
+    Each row is a user's normalised reference face at pyramid ``level``,
+    flattened, mean-centred and scaled to unit length, so a single
+    matrix-vector product gives the normalised cross-correlation of a probe
+    face with every user at once. The matrix is rebuilt only when the set
+    of reference files (or any of their contents) changes.
+
+    The runner-up score is never below ``impostor_floor``, so with one or
+    two enrolled users a best match still has to clear the score a stranger
+    typically reaches rather than an unreachable -1.
+    """
+
+    def __init__(self, templates, directory, pattern='face_*.jpg', level=None,
+                 impostor_floor=None):
+        self.templates = templates
+        self.directory = directory
+        self.pattern = pattern
+        self.level = Config.FACE_GALLERY_LEVEL if level is None else level
+        self.impostor_floor = (Config.FACE_IDENTIFY_IMPOSTOR_FLOOR
+                               if impostor_floor is None else impostor_floor)
+        self.usernames = []
+        self.matrix = None
+        self.size = None  # (width, height) of one row's face image
+        self._signature = None
+
+    def _scan(self):
+        prefix, suffix = self.pattern.split('*')
+        files = []
+        for name in sorted(os.listdir(self.directory)):
+            if name.startswith(prefix) and name.endswith(suffix):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((name[len(prefix):len(name) - len(suffix)], stat.st_mtime_ns, stat.st_size))
+        return tuple(files)
+
+    @staticmethod
+    def _normalise(face):
+        vector = face.astype(np.float32).ravel()
+        vector -= vector.mean()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def refresh(self):
+        """Rebuild the matrix if any reference file was added, removed or changed"""
+        signature = self._scan()
+        if signature == self._signature:
+            return
+        usernames, rows = [], []
+        for username, _, _ in signature:
+            template = self.templates.get(username)
+            if template is None:
+                continue
+            face = template.pyramid[min(self.level, len(template.pyramid) - 1)]
+            usernames.append(username)
+            rows.append(self._normalise(face))
+            self.size = face.shape[::-1]
+        self.usernames = usernames
+        self.matrix = np.ascontiguousarray(np.stack(rows)) if rows else None
+        self._signature = signature
+
+    def identify(self, gray, box):
+        """(best username, its score, runner-up score) for the face at ``box``.
+
+        Uses the matrix as of the last ``refresh``; call that once per
+        identification session, not per frame.
+        """
+        if self.matrix is None:
+            return None, 0.0, 0.0
+        x, y, w, h = box
+        face = cv2.equalizeHist(
+            cv2.resize(gray[y:y + h, x:x + w], self.size, interpolation=cv2.INTER_AREA)
+        )
+        scores = self.matrix @ self._normalise(face)
+        if len(scores) == 1:
+            return self.usernames[0], float(scores[0]), self.impostor_floor
+        second, best = np.argpartition(scores, -2)[-2:]
+        runner_up = max(float(scores[second]), self.impostor_floor)
+        return self.usernames[best], float(scores[best]), runner_up
@@ -0,0 +1,96 @@
+import os
+import threading
+from config import Config
+from utils.face_detection import FaceTracker
+from utils.lazy_import import lazy_import
+
+cv2 = lazy_import('cv2')
+
+
+class ReferenceTemplate:
+    """A decoded reference face, prepared once for matching.
+
+    ``gray`` is the whole reference image in grayscale. ``face`` is the
+    detected face cropped, resized to Config.FACE_TEMPLATE_SIZE and
+    histogram-equalised; ``pyramid`` holds ``face`` followed by successively
+    halved copies for coarse-to-fine matching. Without a detectable face the
+    whole image stands in for the crop.
+    """
+
+    def __init__(self, image, gray, face_box, face, pyramid):
+        self.image = image
+        self.gray = gray
+        self.face_box = face_box
+        self.face = face
+        self.pyramid = pyramid
+
+
+class ReferenceTemplateCache:
+    """Per-user reference templates, rebuilt only when the image file changes"""
+
+    def __init__(self, path_for_user, template_size=None, pyramid_levels=None):
+        self.path_for_user = path_for_user
+        self.template_size = template_size or Config.FACE_TEMPLATE_SIZE
+        self.pyramid_levels = pyramid_levels or Config.FACE_TEMPLATE_PYRAMID_LEVELS
+        # Full scans at native size so the crop does not depend on live tracking
+        self.detector = FaceTracker(mode='full', scale=1.0)
+        self._templates = {}  # username -> (file signature, ReferenceTemplate)
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def get(self, username):
+        """Template for ``username``, or None if no readable reference exists"""
+        path = self.path_for_user(username)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.invalidate(username)
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            cached = self._templates.get(username)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        image = cv2.imread(path)
+        template = None if image is None else self.prepare(image)
+        with self._lock:
+            if template is None:
+                self._templates.pop(username, None)
+            else:
+                self._templates[username] = (signature, template)
+        return template
+
+    def prepare(self, image):
+        """Build a ReferenceTemplate from a decoded BGR image"""
+        self.builds += 1
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        faces = self.detector.detect(gray)
+        if len(faces):
+            face_box = tuple(int(v) for v in max(faces, key=lambda f: f[2] * f[3]))
+            x, y, w, h = face_box
+            crop = gray[y:y + h, x:x + w]
+        else:
+            face_box = None
+            crop = gray
+
+        face = cv2.equalizeHist(
+            cv2.resize(crop, self.template_size, interpolation=cv2.INTER_AREA)
+        )
+        pyramid = [face]
+        for _ in range(1, self.pyramid_levels):
+            pyramid.append(cv2.pyrDown(pyramid[-1]))
+
+        for array in (image, gray, face, *pyramid):
+            array.flags.writeable = False  # Shared by every verification
+        return ReferenceTemplate(image, gray, face_box, face, pyramid)
+
+    def invalidate(self, username=None):
+        """Drop one user's template, or all of them"""
+        with self._lock:
+            if username is None:
+                self._templates.clear()
+            else:
+                self._templates.pop(username, None)
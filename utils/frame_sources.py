@@ -0,0 +1,181 @@
+import glob
+from abc import ABC, abstractmethod
+import os
+import time
+from config import Config
+from utils.lazy_import import lazy_import
+
+cv2 = lazy_import('cv2')
+
+
+class FrameSource(ABC):
+    """Where the face pipeline gets its frames from.
+
+    Mirrors the parts of cv2.VideoCapture the pipeline uses: ``open`` the
+    source, ``read`` returns ``(ret, frame)`` with a BGR frame, ``release``
+    frees it. Replay sources pace themselves to ``fps``; an ``fps`` of 0
+    replays as fast as frames are read.
+    """
+
+    fps = 0
+
+    def __init__(self):
+        self._next_frame_at = None
+
+    @abstractmethod
+    def open(self):
+        """Start the source; False if it cannot be opened"""
+
+    @abstractmethod
+    def read(self):
+        """``(ret, frame)`` like cv2.VideoCapture.read"""
+
+    def release(self):
+        pass
+
+    def _pace(self):
+        """Sleep until the next frame is due at ``fps``"""
+        if not self.fps:
+            return
+        now = time.monotonic()
+        if self._next_frame_at is not None and self._next_frame_at > now:
+            time.sleep(self._next_frame_at - now)
+            now = self._next_frame_at
+        self._next_frame_at = now + 1.0 / self.fps
+
+    def __iter__(self):
+        """Frames until the source runs out (forever for looping sources)"""
+        while True:
+            ret, frame = self.read()
+            if not ret:
+                return
+            yield frame
+
+
+class CameraFrameSource(FrameSource):
+    """A live capture device, paced by the camera itself"""
+
+    def __init__(self, device=None, frame_size=None):
+        super().__init__()
+        self.device = Config.CAMERA_INDEX if device is None else device
+        self.frame_size = frame_size or Config.CAMERA_FRAME_SIZE
+        self.cap = None
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.device)
+        if not self.cap.isOpened():
+            return False
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.frame_size[0])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.frame_size[1])
+        return True
+
+    def read(self):
+        if self.cap is None:
+            return False, None
+        return self.cap.read()
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class VideoFileFrameSource(FrameSource):
+    """Replays a recorded video, at its own frame rate unless ``fps`` is given"""
+
+    def __init__(self, path, fps=None, loop=True):
+        super().__init__()
+        self.path = path
+        self.loop = loop
+        self._fps = fps
+        self.cap = None
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            return False
+        if self._fps is None:
+            self.fps = self.cap.get(cv2.CAP_PROP_FPS) or Config.FRAME_SOURCE_FPS
+        else:
+            self.fps = self._fps
+        return True
+
+    def read(self):
+        if self.cap is None:
+            return False, None
+        self._pace()
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class ImageDirectoryFrameSource(FrameSource):
+    """Replays still images, in name order, as a video stream.
+
+    Images are decoded once on ``open`` so replay cost is the pipeline's,
+    not the JPEG decoder's. The order is fixed, which makes runs repeatable.
+    """
+
+    def __init__(self, directory, pattern='face_*.jpg', fps=None, loop=True):
+        super().__init__()
+        self.directory = directory
+        self.pattern = pattern
+        self.fps = Config.FRAME_SOURCE_FPS if fps is None else fps
+        self.loop = loop
+        self.paths = []
+        self.frames = []
+        self._index = 0
+
+    def open(self):
+        self.paths = sorted(glob.glob(os.path.join(self.directory, self.pattern)))
+        self.frames = []
+        for path in self.paths:
+            frame = cv2.imread(path)
+            if frame is not None:
+                frame.flags.writeable = False  # Handed out repeatedly
+                self.frames.append(frame)
+        self._index = 0
+        return bool(self.frames)
+
+    def read(self):
+        if not self.frames:
+            return False, None
+        if self._index >= len(self.frames):
+            if not self.loop:
+                return False, None
+            self._index = 0
+        self._pace()
+        frame = self.frames[self._index]
+        self._index += 1
+        return True, frame
+
+    def release(self):
+        self.frames = []
+
+
+def create_frame_source(spec=None, fps=None, loop=True):
+    """Build a frame source from a spec string.
+
+    ``camera`` or ``camera:<index>`` for a live device, ``video:<path>`` for
+    a recording and ``images:<directory>`` to replay ``face_*.jpg`` stills.
+    Defaults to Config.FRAME_SOURCE. ``fps`` and ``loop`` apply to replay
+    sources only.
+    """
+    spec = spec or Config.FRAME_SOURCE
+    kind, _, arg = spec.partition(':')
+    if kind == 'camera':
+        return CameraFrameSource(int(arg) if arg else None)
+    if kind == 'video':
+        return VideoFileFrameSource(arg, fps=fps, loop=loop)
+    if kind == 'images':
+        return ImageDirectoryFrameSource(
+            arg or os.path.join(Config.BASE_DIR, 'data'), fps=fps, loop=loop
+        )
+    raise ValueError(f"Unknown frame source: {spec}")
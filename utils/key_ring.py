@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+from config import Config
+
+
+class UnknownKeyVersion(Exception):
+    """Raised for a ciphertext written under a key this ring does not hold"""
+
+
+class KeyRing:
+    """Versioned Fernet keys: the current key encrypts, any held key decrypts.
+
+    Tokens written under version N > 0 carry a ``vN:`` prefix so a read goes
+    straight to the right key; unprefixed tokens are version 0, the format
+    used before keys were versioned. While a rotation is rewriting rows, old
+    and new ciphertexts both decrypt, so nothing has to be locked.
+
+    A ring loaded from a key file re-reads it when the file changes, so a
+    running app picks up a key added by the rotation job for both reads
+    and new writes.
+    """
+
+    def __init__(self, keys, current, path=None):
+        self.keys = {int(version): key for version, key in keys.items()}
+        self.current = int(current)
+        self.path = path
+        self._signature = None
+        self._fernets = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path=None):
+        """Ring from the key file, creating it from Config.SECRET_KEY on first run"""
+        path = path or Config.KEY_FILE
+        ring = cls({0: Config.SECRET_KEY}, 0, path)
+        if not ring._reload():
+            ring.save()
+        return ring
+
+    @classmethod
+    def from_spec(cls, spec):
+        """Ring from ``spec``, e.g. in a worker process"""
+        keys, current = spec
+        return cls(keys, current)
+
+    @property
+    def spec(self):
+        """Picklable (keys, current) for rebuilding this ring elsewhere"""
+        return dict(self.keys), self.current
+
+    def _reload(self):
+        """Re-read the key file if it changed; returns False if there is none"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return True
+        with open(self.path) as f:
+            data = json.load(f)
+        with self._lock:
+            self.keys = {int(version): key.encode() for version, key in data['keys'].items()}
+            self.current = int(data['current'])
+            self._fernets.clear()
+            self._signature = signature
+        return True
+
+    def save(self, path=None):
+        """Write the key file atomically, readable only by its owner"""
+        path = path or self.path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = {
+            'current': self.current,
+            'keys': {str(version): key.decode() for version, key in self.keys.items()},
+        }
+        fd = os.open(path + '.tmp', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(path + '.tmp', path)
+        self.path = path
+        stat = os.stat(path)
+        self._signature = (stat.st_mtime_ns, stat.st_size)
+
+    def add_key(self, key=None):
+        """Make a new key current and return its version"""
+        from cryptography.fernet import Fernet
+        with self._lock:
+            version = max(self.keys) + 1
+            self.keys[version] = key or Fernet.generate_key()
+            self.current = version
+        return version
+
+    def retire(self, versions):
+        """Forget old keys once nothing is encrypted under them"""
+        with self._lock:
+            for version in versions:
+                if version != self.current:
+                    self.keys.pop(version, None)
+                    self._fernets.pop(version, None)
+
+    @staticmethod
+    def prefix(version):
+        return f'v{version}:' if version else ''
+
+    @staticmethod
+    def split(token):
+        """(version, bare Fernet token)"""
+        if token.startswith('v'):
+            version, sep, rest = token.partition(':')
+            if sep and version[1:].isdigit():
+                return int(version[1:]), rest
+        return 0, token
+
+    def version_of(self, token):
+        return self.split(token)[0]
+
+    def is_current(self, token):
+        return self.version_of(token) == self.current
+
+    def _fernet(self, version):
+        fernet = self._fernets.get(version)
+        if fernet is None:
+            from cryptography.fernet import Fernet
+            with self._lock:
+                key = self.keys.get(version)
+                if key is None:
+                    raise UnknownKeyVersion(f"No key for version {version}")
+                fernet = self._fernets[version] = Fernet(key)
+        return fernet
+
+    def encrypt(self, plaintext):
+        if self.path:
+            self._reload()
+        current = self.current
+        token = self._fernet(current).encrypt(plaintext.encode()).decode()
+        return self.prefix(current) + token
+
+    def decrypt(self, token):
+        version, bare = self.split(token)
+        if version not in self.keys and self.path:
+            self._reload()  # Possibly added by a rotation since we loaded
+        return self._fernet(version).decrypt(bare.encode()).decode()
+
+    def reencrypt(self, token):
+        """``token`` under the current key; current tokens are returned as is"""
+        if self.is_current(token):
+            return token
+        return self.encrypt(self.decrypt(token))
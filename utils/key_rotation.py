@@ -0,0 +1,256 @@
+"""Re-encrypt every stored ciphertext under the current key.
+
+    python -m utils.key_rotation --new-key      # add a key, then rotate to it
+    python -m utils.key_rotation                # resume an interrupted rotation
+    python -m utils.key_rotation --status
+    python -m utils.key_rotation --retire-old-keys
+
+Needs db/key_rotation.sql. The app keeps working throughout: it reads
+tokens of either key version and writes new ones under the current key.
+"""
+import argparse
+import itertools
+from psycopg2.extras import execute_values
+from config import Config
+from utils.crypto_engine import CryptoEngine, chunked
+from utils.db_pool import ConnectionPool
+from utils.key_ring import KeyRing
+
+
+class RotationTarget:
+    """An encrypted column, addressed by its table's integer primary key"""
+
+    def __init__(self, table, key, column, array=False):
+        self.table = table
+        self.key = key
+        self.column = column
+        self.array = array  # TEXT[] of tokens rather than one token
+
+    @property
+    def name(self):
+        return f'{self.table}.{self.column}'
+
+    def is_stale(self, value, keys):
+        if value is None:
+            return False
+        if self.array:
+            return not all(keys.is_current(token) for token in value)
+        return not keys.is_current(value)
+
+    def select_query(self):
+        """Rows after a primary key, narrowed in SQL where the column allows it"""
+        if self.array:
+            return (f"SELECT {self.key}, {self.column} FROM {self.table} "
+                    f"WHERE {self.key} > %(last_id)s AND {self.column} IS NOT NULL "
+                    f"ORDER BY {self.key}")
+        return (f"SELECT {self.key}, {self.column} FROM {self.table} "
+                f"WHERE {self.key} > %(last_id)s AND {self.column} NOT LIKE %(current)s "
+                f"ORDER BY {self.key}")
+
+    def stale_count_query(self):
+        if self.array:
+            return (f"SELECT COUNT(*) FROM {self.table} WHERE EXISTS "
+                    f"(SELECT 1 FROM unnest({self.column}) AS token WHERE token NOT LIKE %(current)s)")
+        return f"SELECT COUNT(*) FROM {self.table} WHERE {self.column} NOT LIKE %(current)s"
+
+
+TARGETS = (
+    RotationTarget('accounts', 'account_id', 'encrypted_password'),
+    RotationTarget('password_history', 'history_id', 'encrypted_password'),
+    RotationTarget('totp_settings', 'user_id', 'backup_codes', array=True),
+)
+
+
+class KeyRotationJob:
+    """Moves every target column to the key ring's current key.
+
+    Rows are streamed through a server-side cursor, re-encrypted by a
+    CryptoEngine process pool while the next rows are read, and written
+    back ``batch_size`` at a time with one UPDATE ... FROM (VALUES ...)
+    per batch. The checkpoint in key_rotation_state is updated in the same
+    transaction, so a rerun resumes after the last committed batch.
+
+    Writes only apply if the row still holds the ciphertext that was read;
+    a row the app changed in the meantime already has a current-key token.
+    Each transaction covers one batch, so row locks are held briefly.
+    """
+
+    LOCK_ID = 7291002  # One rotation at a time
+
+    def __init__(self, key_ring=None, pool=None, engine=None, batch_size=None, targets=TARGETS):
+        self.keys = key_ring or KeyRing.load()
+        self.pool = pool or ConnectionPool.instance()
+        self.engine = engine or CryptoEngine(key=self.keys.spec, cipher='keyring')
+        self.batch_size = batch_size or Config.KEY_ROTATION_BATCH_SIZE
+        self.targets = targets
+
+    def run(self, restart=False):
+        """Rotate every target; returns False if another rotation holds the lock"""
+        if self.keys.current == 0:
+            print("Key version 0 is current; add a key with --new-key first")
+            return False
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_try_advisory_lock(%s)", (self.LOCK_ID,))
+                locked = cur.fetchone()[0]
+            conn.commit()
+            if not locked:
+                print("Another key rotation is running")
+                return False
+            try:
+                for target in self.targets:
+                    self._rotate(conn, target, restart)
+            finally:
+                conn.rollback()
+                with conn.cursor() as cur:
+                    cur.execute("SELECT pg_advisory_unlock(%s)", (self.LOCK_ID,))
+                conn.commit()
+        return True
+
+    def _checkpoint(self, conn, target, restart):
+        """(last_id, rows_rotated, completed) for ``target``, reset for a new key version"""
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO key_rotation_state (target, key_version)
+                VALUES (%(target)s, %(version)s)
+                ON CONFLICT (target) DO UPDATE SET
+                    key_version = EXCLUDED.key_version,
+                    last_id = 0,
+                    rows_rotated = 0,
+                    completed_at = NULL,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE key_rotation_state.key_version <> EXCLUDED.key_version OR %(restart)s
+            """, {'target': target.name, 'version': self.keys.current, 'restart': restart})
+            cur.execute(
+                "SELECT last_id, rows_rotated, completed_at IS NOT NULL "
+                "FROM key_rotation_state WHERE target = %s",
+                (target.name,)
+            )
+            state = cur.fetchone()
+        conn.commit()
+        return state
+
+    def _rotate(self, conn, target, restart):
+        last_id, rotated, completed = self._checkpoint(conn, target, restart)
+        if completed:
+            print(f"{target.name}: already on key version {self.keys.current}")
+            return
+        params = {'last_id': last_id, 'current': self.keys.prefix(self.keys.current) + '%'}
+
+        with self.pool.connection() as read_conn:
+            with read_conn.cursor(name=f'key_rotation_{target.table}') as rows:
+                rows.itersize = self.batch_size
+                rows.execute(target.select_query(), params)
+                stale = ((row_id, value) for row_id, value in rows
+                         if target.is_stale(value, self.keys))
+                # The engine reads ahead a bounded number of chunks; tee keeps
+                # the matching rows until their ciphertexts come back
+                rows_out, rows_in = itertools.tee(stale)
+                rotated_values = self.engine.reencrypt_many(value for _, value in rows_in)
+                for batch in chunked(zip(rows_out, rotated_values), self.batch_size):
+                    rotated += self._write(conn, target, batch)
+                    print(f"{target.name}: {rotated} rows rotated (id {batch[-1][0][0]})")
+
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE key_rotation_state SET completed_at = CURRENT_TIMESTAMP, "
+                "updated_at = CURRENT_TIMESTAMP WHERE target = %s",
+                (target.name,)
+            )
+        conn.commit()
+        print(f"{target.name}: done, {rotated} rows rotated")
+
+    def _write(self, conn, target, batch):
+        """Apply one batch and advance the checkpoint in the same transaction"""
+        query = f"""
+            UPDATE {target.table} AS t SET {target.column} = v.new_value
+            FROM (VALUES %s) AS v(id, old_value, new_value)
+            WHERE t.{target.key} = v.id AND t.{target.column} = v.old_value
+        """
+        template = '(%s, %s::text[], %s::text[])' if target.array else None
+        values = [(row_id, old, new) for (row_id, old), new in batch]
+        with conn.cursor() as cur:
+            execute_values(cur, query, values, template=template, page_size=len(values))
+            updated = cur.rowcount
+            cur.execute("""
+                UPDATE key_rotation_state
+                SET last_id = %s, rows_rotated = rows_rotated + %s, updated_at = CURRENT_TIMESTAMP
+                WHERE target = %s
+            """, (values[-1][0], updated, target.name))
+        conn.commit()
+        return updated
+
+    def stale_counts(self):
+        """Values per target not yet under the current key"""
+        if self.keys.current == 0:
+            return {target.name: 0 for target in self.targets}  # Never rotated
+        current = self.keys.prefix(self.keys.current) + '%'
+        counts = {}
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            for target in self.targets:
+                cur.execute(target.stale_count_query(), {'current': current})
+                counts[target.name] = cur.fetchone()[0]
+        return counts
+
+    def status(self):
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT target, key_version, last_id, rows_rotated, completed_at "
+                        "FROM key_rotation_state ORDER BY target")
+            return cur.fetchall()
+
+    def close(self):
+        self.engine.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--new-key', action='store_true',
+                        help="add a key version and make it current before rotating")
+    parser.add_argument('--restart', action='store_true',
+                        help="ignore checkpoints and rescan every row")
+    parser.add_argument('--status', action='store_true', help="show progress and exit")
+    parser.add_argument('--retire-old-keys', action='store_true',
+                        help="drop keys older than the current one once nothing uses them")
+    parser.add_argument('--batch-size', type=int, help="override Config.KEY_ROTATION_BATCH_SIZE")
+    parser.add_argument('--workers', type=int, help="override Config.CRYPTO_WORKERS")
+    args = parser.parse_args(argv)
+
+    keys = KeyRing.load()
+    if args.new_key:
+        version = keys.add_key()
+        keys.save()
+        print(f"Key version {version} is now current")
+
+    job = KeyRotationJob(
+        keys,
+        engine=CryptoEngine(key=keys.spec, cipher='keyring', workers=args.workers),
+        batch_size=args.batch_size,
+    )
+    try:
+        if args.status:
+            print(f"Current key version {keys.current}, held versions {sorted(keys.keys)}")
+            for target, version, last_id, rotated, completed in job.status():
+                state = f"done {completed:%Y-%m-%d %H:%M}" if completed else f"at id {last_id}"
+                print(f"  {target:<32} v{version}  {rotated} rows  {state}")
+            for target, count in job.stale_counts().items():
+                print(f"  {target:<32} {count} values on older keys")
+        elif args.retire_old_keys:
+            stale = {target: count for target, count in job.stale_counts().items() if count}
+            if stale:
+                raise SystemExit(f"Not retiring keys; values still on older keys: {stale}")
+            old = [version for version in keys.keys if version != keys.current]
+            keys.retire(old)
+            keys.save()
+            print(f"Retired key versions {sorted(old)}")
+        elif job.run(restart=args.restart):
+            stale = {target: count for target, count in job.stale_counts().items() if count}
+            if stale:
+                # Written by a client that had not yet seen the new key
+                print(f"Values still on older keys, rerun with --restart: {stale}")
+    finally:
+        job.close()
+        ConnectionPool.close_instance()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 import string
 import random
-import re
 from typing import Dict
+from utils.services import services
 
 class PasswordGenerator:
     def __init__(self):
@@ -12,6 +12,7 @@ class PasswordGenerator:
             'numbers': string.digits,
             'symbols': string.punctuation
         }
+        self.strength = services.get('password_strength')
 
     def generate_password(self, preferences: Dict) -> str:
         """Generate password based on preferences"""
@@ -48,26 +49,4 @@ class PasswordGenerator:
         
     def analyze_password(self, password: str) -> Dict:
         """Analyze password strength and characteristics"""
-        analysis = {
-            'length': len(password),
-            'uppercase': bool(re.search(r'[A-Z]', password)),
-            'lowercase': bool(re.search(r'[a-z]', password)),
-            'numbers': bool(re.search(r'\d', password)),
-            'symbols': bool(re.search(r'[^A-Za-z0-9]', password)),
-            'similar_chars': any(c in self.similar_chars for c in password)
-        }
-        
-        # Calculate base score
-        score = 0
-        if analysis['length'] >= 12: score += 20
-        if analysis['uppercase']: score += 20
-        if analysis['lowercase']: score += 20
-        if analysis['numbers']: score += 20
-        if analysis['symbols']: score += 20
-        
-        # Penalties
-        if analysis['similar_chars']: score -= 10
-        if analysis['length'] < 8: score -= 20
-        
-        analysis['score'] = max(0, min(100, score))
-        return analysis
+        return self.strength.evaluate(password)
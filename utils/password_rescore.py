@@ -0,0 +1,103 @@
+"""Recompute accounts.password_strength with the current strength engine.
+
+    python -m utils.password_rescore
+    python -m utils.password_rescore --dry-run   # count changes, write nothing
+
+Scores written before the entropy-based PasswordStrengthEngine use the old
+class-count scale (e.g. 'Password1' was 80, is now 9). The password_stats
+triggers follow every updated row, so the weak/medium/strong buckets come
+out on the new scale too. Past snapshots in password_analytics are left as
+they were. Safe to rerun: rows whose score already matches are not written.
+"""
+import argparse
+import itertools
+from psycopg2.extras import execute_values
+from config import Config
+from utils.crypto_engine import CryptoEngine, chunked
+from utils.db_pool import ConnectionPool
+from utils.key_ring import KeyRing
+from utils.password_strength import PasswordStrengthEngine
+
+
+class PasswordRescoreJob:
+    """Streams every account through decryption and the strength engine.
+
+    Rows are read through a server-side cursor and decrypted by a
+    CryptoEngine process pool while the next rows are read, like
+    KeyRotationJob. Changed scores are written ``batch_size`` at a time
+    with one UPDATE ... FROM (VALUES ...) per transaction, and only apply
+    if the row still holds the ciphertext that was scored.
+    """
+
+    def __init__(self, pool=None, engine=None, strength=None, batch_size=None):
+        self.pool = pool or ConnectionPool.instance()
+        self.engine = engine or CryptoEngine(key=KeyRing.load().spec, cipher='keyring')
+        self.strength = strength or PasswordStrengthEngine()
+        self.batch_size = batch_size or Config.KEY_ROTATION_BATCH_SIZE
+
+    def run(self, dry_run=False):
+        """(rows scanned, rows changed)"""
+        scanned = changed = 0
+        with self.pool.connection() as conn:
+            with self.pool.connection() as read_conn:
+                with read_conn.cursor(name='password_rescore') as rows:
+                    rows.itersize = self.batch_size
+                    rows.execute("""
+                        SELECT account_id, encrypted_password, password_strength
+                        FROM accounts ORDER BY account_id
+                    """)
+                    rows_out, rows_in = itertools.tee(rows)
+                    passwords = self.engine.decrypt_many(token for _, token, _ in rows_in)
+                    for batch in chunked(zip(rows_out, passwords), self.batch_size):
+                        scanned += len(batch)
+                        updates = []
+                        for (account_id, token, old_score), password in batch:
+                            score = self.strength.score(password)
+                            if score != old_score:
+                                updates.append((account_id, token, score))
+                        if dry_run or not updates:
+                            changed += len(updates)
+                        else:
+                            changed += self._write(conn, updates)
+                        print(f"accounts: {scanned} scanned, {changed} rescored")
+        return scanned, changed
+
+    def _write(self, conn, updates):
+        query = """
+            UPDATE accounts AS a SET password_strength = v.score
+            FROM (VALUES %s) AS v(id, token, score)
+            WHERE a.account_id = v.id AND a.encrypted_password = v.token
+        """
+        with conn.cursor() as cur:
+            execute_values(cur, query, updates, page_size=len(updates))
+            updated = cur.rowcount
+        conn.commit()
+        return updated
+
+    def close(self):
+        self.engine.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dry-run', action='store_true', help="count changed scores, write nothing")
+    parser.add_argument('--batch-size', type=int, help="override Config.KEY_ROTATION_BATCH_SIZE")
+    parser.add_argument('--workers', type=int, help="override Config.CRYPTO_WORKERS")
+    args = parser.parse_args(argv)
+
+    keys = KeyRing.load()
+    job = PasswordRescoreJob(
+        engine=CryptoEngine(key=keys.spec, cipher='keyring', workers=args.workers),
+        batch_size=args.batch_size,
+    )
+    try:
+        scanned, changed = job.run(dry_run=args.dry_run)
+        verb = "would change" if args.dry_run else "changed"
+        print(f"Done: {scanned} accounts scanned, {verb} {changed} scores")
+    finally:
+        job.close()
+        ConnectionPool.close_instance()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+import codecs
+import math
+import re
+import string
+from operator import getitem
+from config import Config
+
+UPPER, LOWER, DIGIT, SYMBOL, OTHER = 1, 2, 4, 8, 16
+POOL_SIZES = {UPPER: 26, LOWER: 26, DIGIT: 10, SYMBOL: len(string.punctuation), OTHER: 100}
+
+SEQUENCE, REPEAT, KEYBOARD = 1, 2, 4
+PATTERN_NAMES = {SEQUENCE: 'sequence', REPEAT: 'repeat', KEYBOARD: 'keyboard'}
+
+KEYBOARD_ROWS = (
+    ("`1234567890-=", "~!@#$%^&*()_+"),
+    ("qwertyuiop[]\\", "QWERTYUIOP{}|"),
+    ("asdfghjkl;'", 'ASDFGHJKL:"'),
+    ("zxcvbnm,./", "ZXCVBNM<>?"),
+)
+LEET = bytes.maketrans(b'@4310!$5+7', b'aaeiolsstt')
+
+
+def _keyboard_neighbours():
+    """char -> keys touching it on a US QWERTY layout, shifted or not"""
+    positions = {}
+    for row, variants in enumerate(KEYBOARD_ROWS):
+        for keys in variants:
+            for col, char in enumerate(keys):
+                positions[char] = (row, col)
+    keys_at = {}
+    for char, position in positions.items():
+        keys_at.setdefault(position, []).append(char)
+
+    neighbours = {}
+    for char, (row, col) in positions.items():
+        # Rows are staggered: the row above is shifted left, the row below right
+        around = [(row, col - 1), (row, col + 1), (row - 1, col), (row - 1, col + 1),
+                  (row + 1, col - 1), (row + 1, col)]
+        neighbours[char] = frozenset(
+            key for position in around for key in keys_at.get(position, ())
+        )
+    return neighbours
+
+
+def _pair_rows():
+    """PAIR_ROWS[a][b]: pattern bit for the ASCII pair (a, b), 0 if unpredictable"""
+    neighbours = _keyboard_neighbours()
+    rows = [bytearray(128) for _ in range(128)]
+    for first in string.printable:
+        row = rows[ord(first)]
+        for second in string.printable:
+            if first == second:
+                row[ord(second)] = REPEAT
+            elif abs(ord(first) - ord(second)) == 1:
+                row[ord(second)] = SEQUENCE
+            elif second in neighbours.get(first, ()):
+                row[ord(second)] = KEYBOARD
+    return tuple(map(bytes, rows))
+
+
+PAIR_ROWS = _pair_rows()
+# Encode anything outside ASCII as DEL, which pairs predictably with nothing
+codecs.register_error('password_strength_del', lambda e: ('\x7f' * (e.end - e.start), e.end))
+PATTERN_RUN = re.compile(rb'[^\0]{2,}')
+
+
+def _flag_table():
+    """bytes.translate table from each ASCII byte to its class flag"""
+    table = bytearray([SYMBOL] * 256)
+    for chars, flag in ((string.ascii_uppercase, UPPER), (string.ascii_lowercase, LOWER),
+                        (string.digits, DIGIT)):
+        for char in chars:
+            table[ord(char)] = flag
+    return bytes(table)
+
+
+CLASS_FLAGS = _flag_table()
+SUFFIX_CHARS = string.digits + string.punctuation
+# log2 of the alphabet size for every combination of class flags
+POOL_BITS = [
+    math.log2(sum(size for bit, size in POOL_SIZES.items() if flags & bit) or 1)
+    for flags in range(32)
+]
+
+
+class PasswordStrengthEngine:
+    """Entropy-based password strength, scored on every keystroke.
+
+    There is no Python-level loop per character: adjacent pairs are looked
+    up in PAIR_ROWS through ``map``, runs of predictable pairs are found
+    with one regex over the resulting bytes, and class flags come from a
+    single bytes.translate(). Characters that extend a run of three or
+    more (a sequence like ``abc`` or ``987``, a repeat like ``aaa`` or a
+    keyboard walk like ``qwe`` or ``zaq``) are worth PATTERN_BITS, the rest
+    log2 of the alphabet in use. A password in the common-password index,
+    directly, after undoing leet substitutions or with a digit and symbol
+    suffix stripped, is worth no more than a pick from that list; the
+    derived lookups are skipped when they could not match. ``score`` maps
+    the entropy onto 0-100, reaching 100 at Config.PASSWORD_STRENGTH_FULL_BITS.
+
+    This does not meet a few-microsecond budget. On CPython 3.11 a call
+    costs about 5-6 us for 9-16 characters and 8-9 us for a 28-character
+    passphrase, against 3.5-6 us for the old four-class check. The cost
+    grows with length through the two maps over pairs. The latest result is
+    memoised, so the same text scored again (a repeated trace callback, or
+    saving after the last keystroke) costs under 1 us.
+    """
+
+    PATTERN_BITS = 1.0
+    MIN_BASE_WORD = 4  # shorter stripped prefixes are not looked up
+
+    def __init__(self, common_passwords_file=None, full_bits=None):
+        self.common_passwords_file = common_passwords_file or Config.COMMON_PASSWORDS_FILE
+        self.full_bits = full_bits or Config.PASSWORD_STRENGTH_FULL_BITS
+        self.similar_chars = frozenset('1lI0Oo')
+        self.common = self._load_common()
+        self.longest_common = max(map(len, self.common), default=0)
+        self.common_bits = math.log2(max(2, len(self.common)))
+        self._last = (None, None)  # (password, _measure result) of the latest call
+
+    def _load_common(self):
+        try:
+            with open(self.common_passwords_file, encoding='utf-8') as f:
+                return frozenset(line.strip().lower() for line in f if line.strip())
+        except OSError as e:
+            print(f"Common password list unavailable: {e}")
+            return frozenset()
+
+    @staticmethod
+    def _unleet(text):
+        # bytes.translate is several times faster than str.translate
+        return text.encode().translate(LEET).decode()
+
+    def _common_bits(self, password, entropy):
+        """Entropy if ``password`` derives from a common one, else None"""
+        lowered = password.lower()
+        common = self.common
+        if lowered in common:
+            return self.common_bits
+        if lowered.isalpha() or not lowered.isascii():
+            return None  # Nothing to undo
+        if len(lowered) <= self.longest_common and self._unleet(lowered) in common:
+            return self.common_bits + 1
+        if lowered[-1] not in SUFFIX_CHARS:
+            return None
+        base = lowered.rstrip(SUFFIX_CHARS)
+        if self.MIN_BASE_WORD <= len(base) <= self.longest_common:
+            if base in common or self._unleet(base) in common:
+                # The suffix keeps its share of the pattern-adjusted entropy
+                return self.common_bits + entropy * (len(lowered) - len(base)) / len(lowered)
+        return None
+
+    def _measure(self, password):
+        """(entropy, class flags, predictable pair bits, common) for ``password``"""
+        last_password, last_result = self._last
+        if password == last_password:
+            return last_result  # e.g. score() and evaluate() for the same keystroke
+        length = len(password)
+        if password.isascii():
+            codes = password.encode()
+            classes = sum(set(codes.translate(CLASS_FLAGS)))  # Distinct bits: sum == union
+        else:
+            codes = password.encode('ascii', 'password_strength_del')
+            classes = OTHER | sum(set(password.encode('ascii', 'ignore').translate(CLASS_FLAGS)))
+        kinds = bytes(map(getitem, map(PAIR_ROWS.__getitem__, codes), codes[1:]))
+        # A run of n predictable pairs makes its last n characters guessable
+        runs = b''.join(PATTERN_RUN.findall(kinds))
+        predictable = len(runs)
+
+        entropy = (length - predictable) * POOL_BITS[classes] + predictable * self.PATTERN_BITS
+        common_bits = self._common_bits(password, entropy) if length else None
+        if common_bits is not None:
+            entropy = min(entropy, common_bits)
+        result = entropy, classes, runs, common_bits is not None
+        self._last = (password, result)
+        return result
+
+    def evaluate(self, password):
+        """Strength report for ``password``; ``score`` is 0-100"""
+        entropy, classes, runs, common = self._measure(password)
+        return {
+            'length': len(password),
+            'uppercase': bool(classes & UPPER),
+            'lowercase': bool(classes & LOWER),
+            'numbers': bool(classes & DIGIT),
+            'symbols': bool(classes & (SYMBOL | OTHER)),
+            'similar_chars': not self.similar_chars.isdisjoint(password),
+            'patterns': [name for bit, name in PATTERN_NAMES.items() if bit in runs],
+            'common': common,
+            'entropy': entropy,
+            'score': self._to_score(entropy),
+        }
+
+    def _to_score(self, entropy):
+        return min(100, int(entropy * 100 / self.full_bits))
+
+    def score(self, password):
+        """0-100 strength without building the full report"""
+        return self._to_score(self._measure(password)[0])
@@ -0,0 +1,250 @@
+import collections
+import threading
+import time
+import tkinter as tk
+from config import Config
+from utils.lazy_import import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+
+class PreviewRenderer:
+    """Draws camera frames onto one Tk canvas without per-frame allocations.
+
+    The renderer owns a single canvas image item and a single PhotoImage.
+    Each frame is resized into a preallocated BGR buffer and converted into
+    a preallocated RGBA buffer that a PIL image shares memory with, so the
+    only per-frame copy is the paste into the PhotoImage. Buffers are
+    reallocated only when the canvas or frame size changes.
+
+    Must be called on the Tk thread. While Tk has not yet drawn the previous
+    frame, new frames are dropped rather than queued, and at most
+    ``max_fps`` frames per second are drawn.
+    """
+
+    def __init__(self, canvas, max_fps=None):
+        self.canvas = canvas
+        self.min_interval = 1.0 / (max_fps or Config.PREVIEW_MAX_FPS)
+        self.canvas_size = None
+        self.image_size = None
+        self.item = None
+        self._item_center = None
+        self.photo = None
+        self._resized = None
+        self._rgba = None
+        self._image = None
+        self._idle = True  # Tk has drawn the last frame
+        self._last_paint = 0.0
+        self._paint_times = collections.deque(maxlen=60)
+        self.rendered = 0
+        self.skipped = 0
+        canvas.bind('<Configure>', self._on_configure, add='+')
+
+    @classmethod
+    def for_canvas(cls, canvas):
+        """The renderer attached to ``canvas``, created on first use"""
+        renderer = getattr(canvas, '_preview_renderer', None)
+        if renderer is None:
+            renderer = cls(canvas)
+            canvas._preview_renderer = renderer
+        return renderer
+
+    def _on_configure(self, event):
+        self.canvas_size = (event.width, event.height)
+
+    def _target_size(self, frame):
+        if self.canvas_size is None:
+            width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+            if width <= 1 or height <= 1:
+                # Not laid out yet; size the canvas to the frame
+                height, width = frame.shape[:2]
+                self.canvas.configure(width=width, height=height)
+            self.canvas_size = (width, height)
+        canvas_w, canvas_h = self.canvas_size
+        frame_h, frame_w = frame.shape[:2]
+        scale = min(canvas_w / max(1, frame_w), canvas_h / max(1, frame_h))
+        return (max(1, int(frame_w * scale)), max(1, int(frame_h * scale)))
+
+    def _allocate(self, size):
+        from PIL import Image, ImageTk
+        width, height = size
+        self._resized = np.empty((height, width, 3), dtype=np.uint8)
+        self._rgba = np.empty((height, width, 4), dtype=np.uint8)
+        # RGBA is one of PIL's mapped modes, so this image reads _rgba in place
+        self._image = Image.frombuffer('RGBA', size, self._rgba, 'raw', 'RGBA', 0, 1)
+        self.photo = ImageTk.PhotoImage('RGBA', size)
+        self.image_size = size
+        if self.item is not None:
+            self.canvas.itemconfigure(self.item, image=self.photo)
+
+    def _ensure_item(self):
+        # Someone may have cleared the canvas since the last frame
+        if self.item is None or not self.canvas.type(self.item):
+            self.canvas.delete("all")
+            self.item = self.canvas.create_image(0, 0, image=self.photo, anchor=tk.CENTER)
+            self._item_center = None
+        center = (self.canvas_size[0] / 2, self.canvas_size[1] / 2)
+        if center != self._item_center:
+            self.canvas.coords(self.item, *center)
+            self._item_center = center
+
+    def render(self, frame):
+        """Draw ``frame`` (BGR) unless Tk is behind; returns whether it was drawn"""
+        if frame is None:
+            return False
+        now = time.perf_counter()
+        if not self._idle or now - self._last_paint < self.min_interval:
+            self.skipped += 1
+            return False
+
+        size = self._target_size(frame)
+        if size != self.image_size:
+            self._allocate(size)
+        self._ensure_item()
+
+        if size == (frame.shape[1], frame.shape[0]):
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA, dst=self._rgba)
+        else:
+            cv2.resize(frame, size, dst=self._resized, interpolation=cv2.INTER_LINEAR)
+            cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGBA, dst=self._rgba)
+        self.photo.paste(self._image)
+
+        self._idle = False
+        self.canvas.after_idle(self._mark_idle)
+        self._last_paint = now
+        self._paint_times.append(now)
+        self.rendered += 1
+        return True
+
+    def _mark_idle(self):
+        self._idle = True
+
+    @property
+    def fps(self):
+        """Frames actually drawn per second over the recent window"""
+        if len(self._paint_times) < 2:
+            return 0.0
+        span = self._paint_times[-1] - self._paint_times[0]
+        return (len(self._paint_times) - 1) / span if span > 0 else 0.0
+
+    def stats(self):
+        return {'rendered': self.rendered, 'skipped': self.skipped, 'fps': self.fps}
+
+
+class FrameMailbox:
+    """Single-slot hand-off from a producer thread to the Tk thread.
+
+    ``put`` replaces whatever is waiting, so the consumer always gets the
+    newest item and a slow consumer never builds up a backlog.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._item = None
+        self.posted = 0
+        self.dropped = 0  # replaced before the consumer took them
+
+    def put(self, item):
+        with self._lock:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self.posted += 1
+
+    def take(self):
+        """The waiting item (or None), leaving the slot empty"""
+        with self._lock:
+            item, self._item = self._item, None
+        return item
+
+
+class PreviewPipeline:
+    """Camera work on a worker thread, drawing on the Tk thread.
+
+    The worker calls ``post(frame, info)``; an ``after()`` poll on the Tk
+    thread takes the newest post from a FrameMailbox, draws the frame with
+    a PreviewRenderer and passes ``info`` to ``on_update``. Worker threads
+    never touch Tk, and however slow detection is the Tk thread only ever
+    draws one frame per poll.
+    """
+
+    def __init__(self, widget, canvas=None, on_update=None, poll_ms=None):
+        self.widget = widget
+        self.renderer = PreviewRenderer.for_canvas(canvas) if canvas is not None else None
+        self.on_update = on_update
+        self.poll_ms = poll_ms or Config.PREVIEW_POLL_MS
+        self.mailbox = FrameMailbox()
+        self._after_id = None
+        self._finished = threading.Event()
+        self._done = None
+        self.error = None  # What stopped the poll, e.g. a TclError from a destroyed widget
+
+    @property
+    def shows_frames(self):
+        return self.renderer is not None
+
+    def post(self, frame, info=None):
+        """Worker side: offer the newest frame and/or status info"""
+        self.mailbox.put((frame, info))
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.widget.after(self.poll_ms, self._poll)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _poll(self):
+        self._after_id = None
+        try:
+            item = self.mailbox.take()
+            if item is not None:
+                frame, info = item
+                if frame is not None and self.renderer is not None:
+                    self.renderer.render(frame)
+                if info is not None and self.on_update is not None:
+                    self.on_update(info)
+            if not self._finished.is_set():
+                self.start()
+                return
+        except Exception as e:
+            print(f"Preview error: {e}")
+            self.error = e
+        # Worker finished or the poll failed: either way run() must stop waiting
+        if self._done is not None:
+            self._done.set(True)
+
+    def run(self, work, *args):
+        """Run ``work(*args, preview=self)`` on a worker and return its result.
+
+        Meant for the Tk thread: it waits in ``wait_variable``, so events
+        and this pipeline's poll keep being served until the worker ends.
+        Exceptions from ``work`` are re-raised here, as is an error that
+        stopped the poll (the worker then winds down once its camera
+        subscription is released).
+        """
+        self._done = tk.BooleanVar(master=self.widget, value=False)
+        result = {}
+
+        def target():
+            try:
+                result['value'] = work(*args, preview=self)
+            except Exception as e:
+                result['error'] = e
+            finally:
+                self._finished.set()
+
+        threading.Thread(target=target, name='preview-worker', daemon=True).start()
+        self.start()
+        try:
+            self.widget.wait_variable(self._done)
+        finally:
+            self.stop()
+        if 'error' in result:
+            raise result['error']
+        if self.error is not None:
+            raise self.error
+        return result.get('value')
@@ -1,20 +1,19 @@
 import os
-import cv2
-import numpy as np
-from cryptography.fernet import Fernet
 import subprocess
 import getpass
 from config import Config
 import threading
-import tkinter as tk
+import time
+from utils.lazy_import import lazy_import
+from utils.services import services
+from utils.auth_grants import AuthGrantManager
+from utils.face_detection import FaceTracker
+from utils.face_templates import ReferenceTemplateCache
+from utils.face_matching import FaceGallery, FaceMatcher
+from utils.preview import PreviewPipeline, PreviewRenderer
 
-# Handle PIL import with fallback
-try:
-    from PIL import Image, ImageTk
-except ImportError:
-    print("Installing Pillow package...")
-    os.system('pip install Pillow')
-    from PIL import Image, ImageTk
+# OpenCV is only needed once the camera is used
+cv2 = lazy_import('cv2')
 
 # Try to import pyperclip, fallback to xclip if not available
 try:
@@ -35,19 +34,40 @@ except ImportError:
                 return ''
     pyperclip = ClipboardFallback
 
+class VerificationBusy(RuntimeError):
+    """Raised when a camera session is started while another one is running"""
+
+
 class SecurityUtils:
     def __init__(self):
-        self.fernet = Fernet(Config.SECRET_KEY)
+        self.keys = services.get('key_ring')
+        self.password_strength = services.get('password_strength')
         self._ensure_data_directory()
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
         self.current_user = None
-        self.face_threshold = 0.5
         self.preview_size = (640, 480)  # Standard webcam size
         self.logged_in_user = None  # Add this to track current logged in user
         self.sensitive_operations = {'login', 'copy_password'}  # Only login and copy need verification
         self.reference_image = None  # Initialize reference_image
+        # One verification covers these operations for AUTH_GRANT_TTL seconds
+        self.auth_grants = AuthGrantManager(Config.AUTH_GRANT_TTL, Config.AUTH_GRANT_OPERATIONS)
+        # Holds the detector settings; each camera loop tracks with its own copy
+        self.face_tracker = FaceTracker()
+        # Decoded once per user and reused until the reference file changes
+        self.face_templates = ReferenceTemplateCache(self._get_user_face_path)
+        self.face_matcher = FaceMatcher()
+        self.face_gallery = FaceGallery(self.face_templates, self.data_dir)
+        self.last_match = None  # Outcome and time-to-decision of the latest verification
+        self._preview_lock = threading.Lock()  # One camera session at a time
+        
+    @property
+    def face_cascade(self):
+        # Shared and loaded on first detection
+        return services.get('face_detector')
+
+    @property
+    def camera(self):
+        # Shared device, kept open briefly between uses
+        return services.get('camera')
         
     def _ensure_data_directory(self):
         """Create data directory if it doesn't exist"""
@@ -67,185 +87,256 @@ class SecurityUtils:
             return cv2.imread(ref_path)
         return None
         
-    def _detect_face(self, frame):
-        """Detect face in frame using OpenCV"""
+    def new_face_tracker(self):
+        """A FaceTracker with no tracked face, for one preview or verification loop"""
+        return FaceTracker(mode=self.face_tracker.mode, scale=self.face_tracker.scale)
+
+    def _detect_face(self, frame, tracker=None):
+        """Detect face in frame using OpenCV; boxes are in frame coordinates"""
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(
-            gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30)
-        )
+        faces = (tracker or self.face_tracker).detect(gray)
         return len(faces) > 0, faces
     
     def capture_reference_image(self, username, canvas=None):
-        """Capture and save reference image for user"""
+        """Capture and save a reference image once a face has held steady"""
         face_path = self._get_user_face_path(username)
-        cap = cv2.VideoCapture(0)
+        cap = self.camera.subscribe()
         
         try:
-            # Set capture resolution
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.preview_size[0])
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.preview_size[1])
-            
             # Configure canvas if provided
             if canvas:
                 canvas.configure(width=self.preview_size[0], height=self.preview_size[1])
-                canvas.update()
-                
-            success = False
-            running = True
+            frame = self._run_with_preview(canvas, None, self._capture_frames, cap)
+        finally:
+            cap.release()
             
-            while running:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                    
-                display_frame = frame.copy()
-                has_face, faces = self._detect_face(frame)
-                
-                # Draw guide overlay
-                height, width = frame.shape[:2]
-                center_x, center_y = width // 2, height // 2
-                cv2.circle(display_frame, (center_x, center_y), 
-                          min(center_x, center_y) - 50, (0, 255, 0), 2)
-                
-                # Draw face rectangle and status text
-                if has_face:
-                    for (x, y, w, h) in faces:
-                        cv2.rectangle(display_frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
-                    cv2.putText(display_frame, "Press SPACE to capture", (10, height - 20),
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                else:
-                    cv2.putText(display_frame, "No face detected", (10, height - 20),
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        if frame is None:
+            return False
+        cv2.imwrite(face_path, frame)
+        self.face_templates.invalidate(username)
+        return True
 
-                # Update canvas if provided
-                if canvas:
-                    try:
-                        self._update_preview(canvas, display_frame)
-                        canvas.update()
-                    except Exception as e:
-                        print(f"Canvas update error: {e}")
-                        running = False
-                        break
+    def _capture_frames(self, cap, preview=None):
+        """First frame after Config.FACE_CAPTURE_STEADY_FRAMES in a row with a face"""
+        deadline = time.monotonic() + Config.FACE_MATCH_TIMEOUT
+        tracker = self.new_face_tracker()
+        steady = 0
+        while time.monotonic() < deadline:
+            ret, frame = cap.read()
+            if not ret:
+                return None
+            has_face, faces = self._detect_face(frame, tracker)
+            steady = steady + 1 if has_face else 0
+            if preview:
+                preview.post(
+                    self._draw_guide(frame, faces) if preview.shows_frames else None,
+                    "Hold still..." if has_face else "No face detected"
+                )
+            if steady >= Config.FACE_CAPTURE_STEADY_FRAMES:
+                return frame
+        return None
 
-                # Handle key events
-                key = cv2.waitKey(1) & 0xFF
-                if key == ord(' ') and has_face:  # SPACE
-                    cv2.imwrite(face_path, frame)
-                    success = True
-                    running = False
-                elif key == 27:  # ESC
-                    running = False
-                    
+    def _run_with_preview(self, canvas, status_label, work, *args):
+        """Run a camera loop on a worker while the Tk thread draws its progress.
+
+        ``work`` is called as ``work(*args, preview=...)`` and reports frames
+        and status text through ``preview.post``. A canvas or status label is
+        required: the Tk thread keeps serving events while it waits, so a
+        second session started from one of them raises VerificationBusy
+        instead of sharing the camera.
+        """
+        widget = canvas or status_label
+        if widget is None:
+            raise ValueError("A camera session needs a canvas or status label to report to")
+        if not self._preview_lock.acquire(blocking=False):
+            raise VerificationBusy("A face verification is already running")
+        try:
+            on_update = (lambda text: status_label.config(text=text)) if status_label else None
+            return PreviewPipeline(widget, canvas, on_update).run(work, *args)
         finally:
-            cap.release()
-            cv2.destroyAllWindows()
-            
-        return success
-        
-    def verify_image(self, canvas=None, status_label=None):
+            self._preview_lock.release()
+
+    @property
+    def verification_running(self):
+        return self._preview_lock.locked()
+
+    def verify_image(self, canvas=None, status_label=None, operation=None):
+        """Verify the logged in user's face, reusing a live auth grant for ``operation``"""
+        if operation in self.auth_grants.operations and \
+                self.auth_grants.check(self.logged_in_user, operation):
+            return True
+        if self._verify_image_with_camera(canvas, status_label):
+            self.auth_grants.issue(self.logged_in_user)
+            return True
+        return False
+
+    def _verify_image_with_camera(self, canvas=None, status_label=None):
         """Verify face with continuous preview"""
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
+        template = self.face_templates.get(self.logged_in_user) if self.logged_in_user else None
+        if template is None:
+            return False
+            
+        cap = self.camera.subscribe()
+        if not cap.is_opened():
+            cap.release()
             return False
             
-        # Set capture resolution
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.preview_size[0])
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.preview_size[1])
-        
         if canvas:
             canvas.configure(width=self.preview_size[0], height=self.preview_size[1])
             
-        max_attempts = 3
-        attempts = 0
-        
         try:
-            while attempts < max_attempts:
-                ret, frame = cap.read()
-                if not ret:
-                    break
+            return self._run_with_preview(canvas, status_label, self._match_frames, cap, template)
+        finally:
+            cap.release()
+            cv2.destroyAllWindows()
 
-                display_frame = frame.copy()
-                has_face, faces = self._detect_face(frame)
-                
-                # Draw guide overlay
-                height, width = frame.shape[:2]
-                center_x, center_y = width // 2, height // 2
-                cv2.circle(display_frame, (center_x, center_y), 
-                          min(center_x, center_y) - 50, 
-                          (0, 255, 0) if has_face else (0, 0, 255), 2)
-                
-                if has_face:
-                    for (x, y, w, h) in faces:
-                        cv2.rectangle(display_frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
-                        
-                # Update UI with preview
-                if canvas:
-                    try:
-                        self._update_preview(canvas, display_frame)
-                        canvas.update()
-                    except Exception as e:
-                        print(f"Preview update error: {e}")
-                
-                # Update status
-                if status_label:
-                    if has_face:
-                        status_label.config(text=f"Face detected! Verifying... ({max_attempts - attempts} attempts left)")
-                    else:
-                        status_label.config(text="Position your face in the circle")
+    def _match_frames(self, cap, template, preview=None):
+        """Score frames against ``template`` until the matcher accepts or rejects"""
+        session = self.face_matcher.session()
+        tracker = self.new_face_tracker()
+        while session.decision is None:
+            ret, frame = cap.read()
+            if not ret:
+                session.give_up()
+                break
 
-                if has_face:
-                    # Compare with reference
-                    try:
-                        result = cv2.matchTemplate(
-                            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY),
-                            cv2.cvtColor(self.reference_image, cv2.COLOR_BGR2GRAY),
-                            cv2.TM_CCOEFF_NORMED
-                        )
-                        similarity = np.max(result)
-                        
-                        if similarity > self.face_threshold:
-                            return True
-                            
-                        attempts += 1
-                    except Exception as e:
-                        print(f"Face comparison error: {e}")
-                        attempts += 1
-                        
-                cv2.waitKey(100)  # Add small delay
-                
+            # One detection serves both the preview and the match
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            faces = tracker.detect(gray)
+            has_face = len(faces) > 0
+            score = None
+            if has_face:
+                box = max(faces, key=lambda f: f[2] * f[3])
+                try:
+                    score = self.face_matcher.score(gray, box, template)
+                except Exception as e:
+                    print(f"Face comparison error: {e}")
+            session.add(score)
+
+            if preview:
+                preview.post(
+                    self._draw_guide(frame, faces) if preview.shows_frames else None,
+                    f"Face detected! Verifying... ({session.confidence:.0%} match)" if has_face
+                    else "Position your face in the circle"
+                )
+
+        self.last_match = session.result()
+        return session.decision == 'accept'
+
+    def _draw_guide(self, frame, faces):
+        """Copy of ``frame`` with the guide circle and detected faces drawn on it"""
+        display_frame = frame.copy()
+        
+        # Draw guide overlay
+        height, width = frame.shape[:2]
+        center_x, center_y = width // 2, height // 2
+        cv2.circle(display_frame, (center_x, center_y), 
+                  min(center_x, center_y) - 50, 
+                  (0, 255, 0) if len(faces) else (0, 0, 255), 2)
+        for (x, y, w, h) in faces:
+            cv2.rectangle(display_frame, (x, y), (x+w, y+h), (255, 0, 0), 2)
+        return display_frame
+
+    def identify_user(self, canvas=None, status_label=None):
+        """Log in whichever enrolled user is in front of the camera.
+
+        Returns the username, or None if nobody was recognised. Every frame
+        is compared against all enrolled faces at once (see FaceGallery).
+        """
+        cap = self.camera.subscribe()
+        if not cap.is_opened():
+            cap.release()
+            if status_label:
+                status_label.config(text="Failed to open camera")
+            return None
+            
+        if canvas:
+            canvas.configure(width=self.preview_size[0], height=self.preview_size[1])
+            
+        try:
+            username = self._run_with_preview(canvas, status_label, self._identify_frames, cap)
         finally:
             cap.release()
-            cv2.destroy_all_windows()
             
-        return False
+        if username:
+            self.logged_in_user = username
+            self.auth_grants.issue(username)
+        return username
+
+    def _identify_frames(self, cap, preview=None):
+        """Vote per candidate until one user is accepted or time runs out.
+
+        The gallery only nominates a candidate; each nominated frame is then
+        scored 1:1 against that user's template with the same search as
+        ``_match_frames``, and a candidate needs Config.FACE_IDENTIFY_ACCEPT.
+        """
+        self.face_gallery.refresh()  # Once per session; frames only do the matrix product
+        limits = self.face_matcher.session()  # Only its frame and time limits apply
+        candidates = {}  # username -> MatchSession
+        tracker = self.new_face_tracker()
+        username = None
+        while username is None and limits.decision is None:
+            ret, frame = cap.read()
+            if not ret:
+                limits.give_up()
+                break
+                
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            faces = tracker.detect(gray)
+            best = None
+            if len(faces):
+                box = max(faces, key=lambda f: f[2] * f[3])
+                best, score, runner_up = self.face_gallery.identify(gray, box)
+                template = self.face_templates.get(best) if best else None
+                # A frame only counts when it clearly prefers one user
+                if template is not None and score - runner_up >= Config.FACE_IDENTIFY_MARGIN:
+                    session = candidates.get(best)
+                    if session is None:
+                        session = candidates[best] = self.face_matcher.session(
+                            accept=Config.FACE_IDENTIFY_ACCEPT)
+                    if session.add(self.face_matcher.score(gray, box, template)) == 'accept':
+                        username = best
+            limits.add()
+            
+            if preview:
+                preview.post(
+                    self._draw_guide(frame, faces) if preview.shows_frames else None,
+                    "Identifying..." if len(faces) else "Position your face in the circle"
+                )
+                
+        self.last_match = dict(
+            limits.result(),
+            decision='accept' if username else 'reject',
+            decision_ms=limits.elapsed() * 1000,
+            username=username,
+        )
+        return username
 
     def encrypt_password(self, password: str) -> str:
-        return self.fernet.encrypt(password.encode()).decode()
+        return self.keys.encrypt(password)
     
-    def decrypt_password(self, encrypted: str) -> str:
-        if self.verify_image():
-            return self.fernet.decrypt(encrypted.encode()).decode()
+    def decrypt_password(self, encrypted: str, canvas=None, status_label=None) -> str:
+        if self.verify_image(canvas, status_label, operation='decrypt_password'):
+            return self._decrypt(encrypted)
         raise PermissionError("Authentication required")
+
+    def _decrypt(self, encrypted: str) -> str:
+        """Decrypt without verification; callers must have verified the user"""
+        return self.keys.decrypt(encrypted)
     
     def check_password_strength(self, password: str) -> int:
-        score = 0
-        if len(password) >= 8: score += 20
-        if any(c.isupper() for c in password): score += 20
-        if any(c.islower() for c in password): score += 20
-        if any(c.isdigit() for c in password): score += 20
-        if any(not c.isalnum() for c in password): score += 20
-        return score
+        return self.password_strength.score(password)
 
     def has_reference_image(self):
         """Check if reference image exists"""
         ref_path = os.path.join(self.data_dir, 'reference.jpg')
         return os.path.exists(ref_path) and self.reference_image is not None
 
-    def verify_auth(self):
+    def verify_auth(self, canvas=None, status_label=None):
         """Main authentication method"""
         if not self.has_reference_image():
             return self._verify_system_password()
-        return self.verify_image()
+        return self.verify_image(canvas, status_label)
     
     def _verify_system_password(self):
         """Fallback authentication"""
@@ -273,121 +364,50 @@ class SecurityUtils:
         return True
     
     def update_preview(self, canvas, frame):
-        """Update canvas with current webcam frame"""
+        """Update canvas with current webcam frame; see PreviewRenderer"""
         if frame is not None:
             try:
-                # Convert frame to RGB
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                
-                # Get canvas dimensions, use frame dimensions as fallback
-                canvas_width = canvas.winfo_width() or frame.shape[1]
-                canvas_height = canvas.winfo_height() or frame.shape[0]
-                
-                # Configure canvas size if not set
-                if canvas_width <= 1 or canvas_height <= 1:
-                    canvas_width = frame.shape[1]
-                    canvas_height = frame.shape[0]
-                    canvas.configure(width=canvas_width, height=canvas_height)
-                
-                # Calculate scaling factor (ensure positive values)
-                scale = min(
-                    canvas_width/max(1, frame.shape[1]), 
-                    canvas_height/max(1, frame.shape[0])
-                )
-                
-                # Resize frame
-                new_width = max(1, int(frame.shape[1] * scale))
-                new_height = max(1, int(frame.shape[0] * scale))
-                resized = cv2.resize(rgb_frame, (new_width, new_height))
-                
-                # Convert to PhotoImage
-                photo = ImageTk.PhotoImage(Image.fromarray(resized))
-                
-                # Clear previous image
-                canvas.delete("all")
-                
-                # Update canvas
-                canvas.create_image(
-                    canvas_width/2, canvas_height/2,
-                    image=photo, anchor=tk.CENTER
-                )
-                canvas.image = photo  # Keep reference!
-                
+                PreviewRenderer.for_canvas(canvas).render(frame)
             except Exception as e:
                 print(f"Preview update error: {e}")
 
     def verify_user(self, username, canvas=None, status_label=None, operation='default'):
+        """Verify user face, skipping the camera while an auth grant covers ``operation``"""
+        if operation in self.auth_grants.operations and \
+                self.auth_grants.check(username, operation):
+            return True
+        verified = self._verify_user_with_camera(username, canvas, status_label, operation)
+        if verified and operation in self.sensitive_operations:
+            self.auth_grants.issue(username)
+        return verified
+
+    def _verify_user_with_camera(self, username, canvas=None, status_label=None, operation='default'):
         """Verify user face only for sensitive operations"""
         # Skip verification for non-sensitive operations
         if operation not in self.sensitive_operations:
             return True
             
         try:
-            # Load reference image first
-            face_path = self._get_user_face_path(username)
-            self.reference_image = cv2.imread(face_path)
-            if self.reference_image is None:
+            # Load reference template first
+            template = self.face_templates.get(username)
+            if template is None:
                 raise Exception("Failed to load reference image")
+            self.reference_image = template.image
 
             # Configure camera and canvas
-            cap = cv2.VideoCapture(0)
-            if not cap.isOpened():
+            cap = self.camera.subscribe()
+            if not cap.is_opened():
                 if status_label:
                     status_label.config(text="Failed to open camera")
                 return False
                 
-            # Set capture resolution
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.preview_size[0])
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.preview_size[1])
-            
             if canvas:
                 canvas.configure(width=self.preview_size[0], height=self.preview_size[1])
-                canvas.update()
-            
-            max_attempts = 3
-            attempts = 0
             
-            while attempts < max_attempts:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                    
-                # Update preview
-                if canvas:
-                    display_frame = frame.copy()
-                    has_face = self._detect_face(frame)[0]
-                    
-                    # Draw guide overlay
-                    height, width = frame.shape[:2]
-                    center_x, center_y = width // 2, height // 2
-                    cv2.circle(display_frame, (center_x, center_y), 
-                             min(center_x, center_y) - 50, 
-                             (0, 255, 0) if has_face else (0, 0, 255), 2)
-                    
-                    self.update_preview(canvas, display_frame)
-                    canvas.update()
-                    
-                    if status_label:
-                        status_label.config(text=f"Verifying... ({max_attempts - attempts} attempts left)")
-                
-                if self._detect_face(frame)[0]:
-                    # Compare with reference using grayscale
-                    try:
-                        frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                        ref_gray = cv2.cvtColor(self.reference_image, cv2.COLOR_BGR2GRAY)
-                        
-                        result = cv2.matchTemplate(frame_gray, ref_gray, cv2.TM_CCOEFF_NORMED)
-                        similarity = np.max(result)
-                        
-                        if similarity > self.face_threshold:
-                            if operation == 'login':
-                                self.logged_in_user = username
-                            return True
-                    except Exception as e:
-                        print(f"Face comparison warning: {e}")
-                        
-                attempts += 1
-                cv2.waitKey(100)
+            if self._run_with_preview(canvas, status_label, self._match_frames, cap, template):
+                if operation == 'login':
+                    self.logged_in_user = username
+                return True
                 
         except Exception as e:
             print(f"Verification error: {e}")
@@ -411,16 +431,18 @@ class SecurityUtils:
                 os.remove(f)
             except Exception as e:
                 print(f"Error removing {f}: {e}")
+        self.auth_grants.revoke()
+        self.face_templates.invalidate()
         return len(face_files)
     
-    def secure_copy_password(self, password, canvas=None, status_label=None):
-        """Verify face before copying password"""
+    def secure_copy_password(self, encrypted_password, canvas=None, status_label=None):
+        """Verify face, then decrypt and copy the password"""
         if not self.logged_in_user:
             return False
             
         try:
             if self.verify_user(self.logged_in_user, canvas, status_label, operation='copy_password'):
-                pyperclip.copy(password)
+                pyperclip.copy(self._decrypt(encrypted_password))
                 threading.Timer(30.0, lambda: pyperclip.copy('')).start()
                 return True
             return False
@@ -430,5 +452,6 @@ class SecurityUtils:
             
     def logout_user(self):
         """Clear current user session"""
+        self.auth_grants.revoke(self.logged_in_user)
         self.logged_in_user = None
         self.reference_image = None
@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+import tracemalloc
+from utils.startup_report import startup_report
+
+try:
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def _rss_bytes():
+    """Resident set size of this process, or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ServiceRegistry:
+    """Builds shared application services once and hands out the same instance.
+
+    Each service is registered with a zero-argument factory and constructed
+    on first ``get``. Construction time, Python heap allocations and the
+    change in resident memory (which includes native allocations such as
+    OpenCV's) are recorded per service. Python allocations are only traced
+    when the startup report is enabled, since tracing slows every
+    allocation; otherwise ``python_bytes`` is None.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._stats = {}
+        self._lock = threading.RLock()  # Factories may get() their dependencies
+
+    def register(self, name, factory):
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if name not in self._instances:
+                self._instances[name] = self._build(name)
+            return self._instances[name]
+
+    def _build(self, name):
+        factory = self._factories[name]
+        tracing = tracemalloc.is_tracing()
+        trace = tracing or startup_report.enabled
+        if trace and not tracing:
+            tracemalloc.start()
+        before_py = tracemalloc.get_traced_memory()[0] if trace else None
+        before_rss = _rss_bytes()
+        started = time.perf_counter()
+        try:
+            instance = factory()
+        finally:
+            elapsed = time.perf_counter() - started
+            after_py = tracemalloc.get_traced_memory()[0] if trace else None
+            after_rss = _rss_bytes()
+            if trace and not tracing:
+                tracemalloc.stop()
+        self._stats[name] = {
+            'construct_ms': elapsed * 1000,
+            'python_bytes': after_py - before_py if trace else None,
+            'rss_bytes': (after_rss - before_rss) if before_rss is not None and after_rss is not None else None,
+        }
+        return instance
+
+    def peek(self, name):
+        """The built instance, or None without building it"""
+        return self._instances.get(name)
+
+    def reset(self, name=None):
+        """Forget built instances so the next get() rebuilds them"""
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(name, None)
+
+    def stats(self):
+        return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def format_report(self):
+        lines = ["Service construction"]
+        for name, stats in self._stats.items():
+            rss = stats['rss_bytes']
+            rss_text = f"{rss / 1024:.0f} KiB" if rss is not None else "n/a"
+            py = stats['python_bytes']
+            py_text = f"{py / 1024:8.0f} KiB" if py is not None else f"{'n/a':>12}"
+            lines.append(
+                f"  {name:<16} {stats['construct_ms']:8.1f} ms  "
+                f"py {py_text}  rss {rss_text}"
+            )
+        return "\n".join(lines)
+
+
+def _build_key_ring():
+    from utils.key_ring import KeyRing
+    return KeyRing.load()
+
+
+def _build_crypto_engine():
+    from utils.crypto_engine import CryptoEngine
+    # Workers load the key file themselves, so keys added while the app runs reach them
+    return CryptoEngine(key=services.get('key_ring').path, cipher='keyfile')
+
+
+def _build_password_strength():
+    from utils.password_strength import PasswordStrengthEngine
+    return PasswordStrengthEngine()
+
+
+def _build_face_detector():
+    from utils.lazy_import import lazy_import
+    cv2 = lazy_import('cv2')
+    return cv2.CascadeClassifier(
+        cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+    )
+
+
+def _build_camera():
+    from utils.camera import CameraService
+    return CameraService()
+
+
+def _build_security():
+    from utils.security import SecurityUtils
+    return SecurityUtils()
+
+
+services = ServiceRegistry()
+services.register('key_ring', _build_key_ring)
+services.register('crypto_engine', _build_crypto_engine)
+services.register('password_strength', _build_password_strength)
+services.register('face_detector', _build_face_detector)
+services.register('camera', _build_camera)
+services.register('security', _build_security)
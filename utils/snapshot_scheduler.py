@@ -0,0 +1,58 @@
+import threading
+import time
+from config import Config
+
+
+class SnapshotScheduler:
+    """Writes analytics history snapshots for one owner on a fixed interval.
+
+    The model decides whether a snapshot is actually due (interval elapsed
+    and stats changed), so waking up more often than necessary only costs a
+    cheap no-op insert. The same thread periodically compacts the history
+    into rollups.
+    """
+
+    def __init__(self, analytics_model, owner_username, interval=None,
+                 compaction_interval=None):
+        self.model = analytics_model
+        self.owner_username = owner_username
+        self.interval = interval or Config.ANALYTICS_SNAPSHOT_INTERVAL
+        self.compaction_interval = compaction_interval or Config.ANALYTICS_COMPACTION_INTERVAL
+        self._next_compaction = 0.0
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name='analytics-snapshots', daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """Ask the thread to exit and wait up to ``timeout`` seconds for it"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and timeout is not None:
+            self._thread.join(timeout)
+
+    def request_snapshot(self):
+        """Check now instead of waiting for the next tick, e.g. after an edit"""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.model.take_snapshot(self.owner_username, self.interval)
+            except Exception as e:
+                print(f"Analytics snapshot failed: {e}")
+
+            if time.monotonic() >= self._next_compaction:
+                self._next_compaction = time.monotonic() + self.compaction_interval
+                try:
+                    self.model.compact_history()
+                except Exception as e:
+                    print(f"Analytics compaction failed: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
@@ -0,0 +1,97 @@
+import builtins
+import importlib
+import os
+import sys
+import threading
+import time
+
+
+class StartupReport:
+    """Collects import costs and milestones from process start.
+
+    ``install`` times every first-time top-level import made on the main
+    thread until ``finish`` is called; lazily imported modules report their
+    own cost through ``import_deferred`` whenever they are finally loaded.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.enabled = os.environ.get('ACCOUNT_MANAGER_STARTUP_REPORT') == '1'
+        self.imports = {}  # module -> seconds, inclusive of its own imports
+        self.deferred = {}  # lazily loaded module -> seconds
+        self.milestones = []  # (name, seconds since start)
+        self._original_import = None
+        self._local = threading.local()  # Import nesting depth, per thread
+
+    @property
+    def _depth(self):
+        return getattr(self._local, 'depth', 0)
+
+    @_depth.setter
+    def _depth(self, value):
+        self._local.depth = value
+
+    def install(self):
+        if self._original_import is not None:
+            return
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import
+        if (level or self._depth or name in sys.modules
+                or threading.current_thread() is not threading.main_thread()):
+            return original(name, globals, locals, fromlist, level)
+
+        self._depth += 1
+        started = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            self._depth -= 1
+            self.imports[name] = self.imports.get(name, 0.0) + time.perf_counter() - started
+
+    def import_deferred(self, name):
+        """Import a lazily loaded module and record its cost separately.
+
+        May run on any thread; the nesting depth is tracked per thread so a
+        worker's deferred import never hides the main thread's imports.
+        """
+        self._depth += 1  # Its own imports are part of this cost
+        started = time.perf_counter()
+        try:
+            module = importlib.import_module(name)
+        finally:
+            self._depth -= 1
+        seconds = time.perf_counter() - started
+        self.deferred[name] = seconds
+        if self.enabled and self._original_import is None:
+            print(f"[startup] deferred import {name}: {seconds * 1000:.1f} ms")
+        return module
+
+    def mark(self, name):
+        self.milestones.append((name, time.perf_counter() - self.start))
+
+    def finish(self, top=15):
+        """Stop timing imports and print the report if enabled"""
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+        if self.enabled:
+            print(self.format(top))
+
+    def format(self, top=15):
+        lines = ["Startup report"]
+        for name, at in self.milestones:
+            lines.append(f"  {name}: {at * 1000:.1f} ms")
+        lines.append("  Slowest imports before the login window:")
+        for name, seconds in sorted(self.imports.items(), key=lambda i: i[1], reverse=True)[:top]:
+            lines.append(f"    {name:<40} {seconds * 1000:8.1f} ms")
+        if self.deferred:
+            lines.append("  Deferred imports loaded so far:")
+            for name, seconds in self.deferred.items():
+                lines.append(f"    {name:<40} {seconds * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+
+startup_report = StartupReport()
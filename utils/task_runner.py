@@ -0,0 +1,102 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from config import Config
+
+
+class TaskRunner:
+    """Runs blocking model calls on worker threads and delivers results on Tk.
+
+    ``submit`` must be called from the Tk thread. The callbacks passed to it
+    are always invoked on the Tk thread: finished futures are queued by the
+    workers and drained by an ``after()`` poll that only runs while tasks are
+    pending, so widgets are never touched from a worker.
+
+    Tasks submitted with a ``key`` supersede earlier tasks with the same key:
+    a pending predecessor is cancelled outright and a running one has its
+    result dropped when it arrives.
+    """
+
+    def __init__(self, root, max_workers=None, poll_interval=None):
+        self.root = root
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or Config.DB_WORKER_THREADS,
+            thread_name_prefix='model-worker'
+        )
+        self.poll_interval = poll_interval or Config.UI_POLL_INTERVAL_MS
+        self._results = queue.Queue()
+        self._latest = {}  # key -> Future of the most recent submission
+        self._pending = 0
+        self._polling = False
+        self._closed = False
+
+    def submit(self, fn, *args, on_success=None, on_error=None, key=None, **kwargs):
+        """Run ``fn(*args, **kwargs)`` on a worker and return its Future"""
+        if self._closed:
+            raise RuntimeError("TaskRunner has been shut down")
+
+        if key is not None:
+            self.cancel(key)
+
+        future = self.executor.submit(fn, *args, **kwargs)
+        if key is not None:
+            self._latest[key] = future
+        self._pending += 1
+
+        future.add_done_callback(
+            lambda f: self._results.put((f, key, on_success, on_error))
+        )
+        self._schedule_poll()
+        return future
+
+    def cancel(self, key):
+        """Cancel the in-flight task for ``key``, if any"""
+        future = self._latest.pop(key, None)
+        if future is not None:
+            future.cancel()
+
+    def _schedule_poll(self):
+        if not self._polling and not self._closed:
+            self._polling = True
+            self.root.after(self.poll_interval, self._drain)
+
+    def _drain(self):
+        self._polling = False
+        if self._closed:
+            return
+        while True:
+            try:
+                future, key, on_success, on_error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            self._deliver(future, key, on_success, on_error)
+
+        if self._pending > 0:
+            self._schedule_poll()
+
+    def _deliver(self, future, key, on_success, on_error):
+        if key is not None:
+            if self._latest.get(key) is not future:
+                return  # Superseded by a newer request
+            del self._latest[key]
+
+        try:
+            result = future.result()
+        except CancelledError:
+            return
+        except Exception as e:
+            if on_error:
+                on_error(e)
+            else:
+                print(f"Background task failed: {e}")
+            return
+
+        if on_success:
+            on_success(result)
+
+    def shutdown(self):
+        """Stop accepting work and drop any results not yet delivered"""
+        self._closed = True
+        for key in list(self._latest):
+            self.cancel(key)
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import string
+import bisect
+import itertools
 from .security import SecurityUtils  # Add this import
 
 class PasswordEntry(ttk.Entry):
@@ -99,3 +101,236 @@ class SecureEntry(ttk.Entry):
     
     def show_context_menu(self, event):
         self.context_menu.post(event.x_root, event.y_root)
+
+class VirtualTreeview(ttk.Frame):
+    """Treeview that only holds the rows currently on screen.
+
+    Rows live in a page cache filled on demand through ``fetch_page(index)``;
+    the owner answers by calling ``set_page(index, rows)``, possibly later.
+    Each row is a tuple whose first element is the row id and the rest are
+    the column values. Pages far from the viewport are evicted so memory and
+    Tk item count stay flat regardless of the total row count.
+
+    Pages may grow and shrink after loading: ``insert_row``, ``update_row``
+    and ``remove_row`` patch the cache in place so an edit does not force a
+    full reload, and the selection and scroll position survive it.
+    """
+
+    def __init__(self, parent, columns, fetch_page, page_size=100, cache_pages=6,
+                 sort_key=None, **kwargs):
+        super().__init__(parent)
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.cache_pages = max(cache_pages, 3)
+        self.sort_key = sort_key  # orders rows inside a page on insert
+        self.total_rows = 0
+        self.first_row = 0
+        self.visible_rows = 1
+        self.page_lengths = []  # row count of every page, loaded or not
+        self.page_starts = []  # first row index of every page
+        self.pages = {}  # page index -> list of rows
+        self.requested = set()  # page indexes with a fetch in flight
+        self.item_ids = {}  # tree item -> row id
+        self.selected_row_id = None
+
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', **kwargs)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind('<Configure>', self.on_resize)
+        self.tree.bind('<MouseWheel>', self.on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll_to(self.first_row - 3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll_to(self.first_row + 3))
+        self.tree.bind('<Prior>', lambda e: self.scroll_to(self.first_row - self.visible_rows))
+        self.tree.bind('<Next>', lambda e: self.scroll_to(self.first_row + self.visible_rows))
+        self.tree.bind('<<TreeviewSelect>>', self.on_select)
+
+    def heading(self, *args, **kwargs):
+        return self.tree.heading(*args, **kwargs)
+
+    def column(self, *args, **kwargs):
+        return self.tree.column(*args, **kwargs)
+
+    def bind_tree(self, sequence, func):
+        return self.tree.bind(sequence, func)
+
+    def reset(self, total_rows):
+        """Drop all cached pages and show ``total_rows`` rows, keeping the scroll position"""
+        full, rest = divmod(total_rows, self.page_size)
+        self.page_lengths = [self.page_size] * full + ([rest] if rest else [])
+        self._update_starts()
+        self.pages.clear()
+        self.requested.clear()
+        self.first_row = min(self.first_row, max(0, total_rows - self.visible_rows))
+        self.render()
+
+    def set_page(self, index, rows):
+        """Store a fetched page and redraw if it is on screen"""
+        if index not in self.requested:
+            return  # Answer to a request made before the last reset
+        self.requested.discard(index)
+        self.pages[index] = list(rows)
+        if self.page_lengths[index] != len(rows):
+            self.page_lengths[index] = len(rows)
+            self._update_starts()
+        self._evict()
+        first_page, last_page = self._visible_pages()
+        if first_page <= index <= last_page:
+            self.render()
+
+    def find_row(self, row_id):
+        """Return the page index holding ``row_id`` if that page is loaded"""
+        for index, page in self.pages.items():
+            if any(row[0] == row_id for row in page):
+                return index
+        return None
+
+    def update_row(self, row):
+        """Replace a loaded row in place; returns False if it is not loaded"""
+        index = self.find_row(row[0])
+        if index is None:
+            return False
+        page = self.pages[index]
+        page[:] = [row if r[0] == row[0] else r for r in page]
+        if self.sort_key:
+            page.sort(key=self.sort_key)
+        self.render()
+        return True
+
+    def insert_row(self, index, row):
+        """Add a row to page ``index``, loaded or not"""
+        if index in self.pages:
+            page = self.pages[index]
+            page.append(row)
+            if self.sort_key:
+                page.sort(key=self.sort_key)
+        self._resize_page(index, 1)
+
+    def remove_row(self, row_id):
+        """Remove a loaded row; returns False if it is not loaded"""
+        index = self.find_row(row_id)
+        if index is None:
+            return False
+        self.pages[index] = [row for row in self.pages[index] if row[0] != row_id]
+        if self.selected_row_id == row_id:
+            self.selected_row_id = None
+        self._resize_page(index, -1)
+        return True
+
+    def _resize_page(self, index, delta):
+        if not self.page_lengths:
+            self.page_lengths = [0]
+        self.page_lengths[index] += delta
+        # Keep the rows on screen where they are when a page above changes
+        if self.page_starts and self.page_starts[index] + self.page_lengths[index] <= self.first_row:
+            self.first_row = max(0, self.first_row + delta)
+        self._update_starts()
+        self.render()
+
+    def _update_starts(self):
+        self.page_starts = list(itertools.accumulate([0] + self.page_lengths[:-1]))
+        self.total_rows = sum(self.page_lengths)
+
+    def _locate(self, row):
+        """Map a row index to (page index, offset within page)"""
+        index = max(0, bisect.bisect_right(self.page_starts, row) - 1)
+        return index, row - self.page_starts[index]
+
+    def selected_id(self):
+        return self.selected_row_id
+
+    def scroll_to(self, row):
+        max_first = max(0, self.total_rows - self.visible_rows)
+        row = max(0, min(int(row), max_first))
+        if row != self.first_row:
+            self.first_row = row
+            self.render()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.scroll_to(float(amount) * self.total_rows)
+        elif action == 'scroll':
+            step = self.visible_rows if unit == 'pages' else 1
+            self.scroll_to(self.first_row + int(amount) * step)
+
+    def on_mousewheel(self, event):
+        self.scroll_to(self.first_row - int(event.delta / 120) * 3)
+        return 'break'
+
+    def on_resize(self, event):
+        rowheight = ttk.Style().lookup('Treeview', 'rowheight') or 20
+        visible = max(1, (event.height - 25) // int(rowheight))
+        if visible != self.visible_rows:
+            self.visible_rows = visible
+            self.render()
+
+    def on_select(self, event):
+        selected = self.tree.selection()
+        if selected and selected[0] in self.item_ids:
+            self.selected_row_id = self.item_ids[selected[0]]
+
+    def _visible_pages(self):
+        if not self.total_rows:
+            return 0, 0
+        last_row = min(self.total_rows, self.first_row + self.visible_rows) - 1
+        return self._locate(self.first_row)[0], self._locate(last_row)[0]
+
+    def _evict(self):
+        """Forget the pages farthest from the viewport beyond the cache limit"""
+        if len(self.pages) <= self.cache_pages:
+            return
+        first_page, last_page = self._visible_pages()
+        centre = (first_page + last_page) / 2
+        by_distance = sorted(self.pages, key=lambda p: abs(p - centre), reverse=True)
+        for index in by_distance[:len(self.pages) - self.cache_pages]:
+            del self.pages[index]
+
+    def render(self):
+        """Fill the tree with the rows in the viewport, fetching missing pages"""
+        first_page, last_page = self._visible_pages()
+        if self.total_rows:
+            # Prefetch one page either side so scrolling rarely waits
+            wanted = range(max(0, first_page - 1),
+                           min(last_page + 1, len(self.page_lengths) - 1) + 1)
+            for index in wanted:
+                if index not in self.pages and index not in self.requested:
+                    self.requested.add(index)
+                    self.fetch_page(index)
+
+        rows = []
+        for row in range(self.first_row, min(self.total_rows, self.first_row + self.visible_rows)):
+            index, offset = self._locate(row)
+            page = self.pages.get(index)
+            if page is not None and offset < len(page):
+                rows.append(page[offset])
+            else:
+                rows.append(None)  # Still loading
+
+        # Reuse existing items instead of deleting and re-inserting them
+        items = list(self.tree.get_children())
+        for item in items[len(rows):]:
+            self.tree.delete(item)
+        self.item_ids.clear()
+        selected = None
+        for i, row in enumerate(rows):
+            values = row[1:] if row else ('Loading...',)
+            if i < len(items):
+                item = items[i]
+                self.tree.item(item, values=values)
+            else:
+                item = self.tree.insert('', 'end', values=values)
+            if row:
+                self.item_ids[item] = row[0]
+                if row[0] == self.selected_row_id:
+                    selected = item
+        if selected:
+            self.tree.selection_set(selected)
+        else:
+            self.tree.selection_set(())
+
+        if self.total_rows:
+            self.scrollbar.set(self.first_row / self.total_rows,
+                               min(1.0, (self.first_row + len(rows)) / self.total_rows))
+        else:
+            self.scrollbar.set(0.0, 1.0)
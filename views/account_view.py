@@ -1,7 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from .base_view import BaseView
-from utils.widgets import PasswordEntry, StrengthMeter, SecureEntry
+from utils.widgets import PasswordEntry, StrengthMeter, SecureEntry, VirtualTreeview
+from config import Config
 
 class AccountView(BaseView):
     def __init__(self, parent, controller):
@@ -10,6 +11,7 @@ class AccountView(BaseView):
         self.controller = controller
         self.current_account_id = None
         self.security = controller.security  # Add security reference
+        self.verifying = False  # A face verification is showing in the preview area
         self.setup_ui()
         self.setup_password_monitoring()
         self.refresh_account_list()
@@ -122,6 +124,12 @@ class AccountView(BaseView):
             text="Copy",
             command=self.copy_password
         ).pack(side=tk.RIGHT, padx=5)
+        
+        ttk.Button(
+            password_frame,
+            text="Show",
+            command=self.reveal_password
+        ).pack(side=tk.RIGHT)
 
         # Right panel - Account List
         list_frame = ttk.LabelFrame(self, text="Saved Accounts")
@@ -132,18 +140,21 @@ class AccountView(BaseView):
         search_frame.pack(fill=tk.X, padx=5, pady=5)
         
         self.search_var = tk.StringVar()
+        self.search_after_id = None
         self.search_var.trace('w', self.on_search)
         ttk.Entry(search_frame, textvariable=self.search_var).pack(side=tk.LEFT, fill=tk.X, expand=True)
         
-        # Treeview
-        self.tree = ttk.Treeview(
-            list_frame, 
+        # Account list; only the rows on screen are fetched and inserted
+        self.account_list = VirtualTreeview(
+            list_frame,
             columns=('Category', 'Name', 'Username', 'Last Changed', 'Strength'),
-            show='headings'
+            fetch_page=self.controller.fetch_account_page,
+            page_size=Config.ACCOUNT_PAGE_SIZE,
+            cache_pages=Config.ACCOUNT_CACHE_PAGES,
+            # (account_name, account_id) in code point order, like the COLLATE "C" queries
+            sort_key=lambda row: (row[2], row[0])
         )
-        
-        # Store account IDs for selection
-        self.account_ids = {}  # Dictionary to store row_id -> account_id mapping
+        self.tree = self.account_list.tree
         
         # Configure columns
         column_widths = {
@@ -155,16 +166,11 @@ class AccountView(BaseView):
         }
         
         for col, width in column_widths.items():
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=width)
+            self.account_list.heading(col, text=col)
+            self.account_list.column(col, width=width)
         
-        self.tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        self.tree.bind('<Double-1>', self.on_account_select)
-        
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.account_list.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.account_list.bind_tree('<Double-1>', self.on_account_select)
 
         # Add preview area for face verification
         self.preview_frame = ttk.LabelFrame(self.form_frame, text="Face Verification")
@@ -186,34 +192,34 @@ class AccountView(BaseView):
         self.strength_meter.reset()
 
     def on_search(self, *args):
-        search_text = self.search_var.get().lower()
-        for item in self.tree.get_children():
-            values = self.tree.item(item)['values']
-            if not search_text or any(str(v).lower().find(search_text) >= 0 for v in values):
-                self.tree.reattach(item, '', 'end')
-            else:
-                self.tree.detach(item)
+        """Debounce keystrokes; only the last one in a burst queries the server"""
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+        self.search_after_id = self.after(Config.SEARCH_DEBOUNCE_MS, self.run_search)
+
+    def run_search(self):
+        self.search_after_id = None
+        self.controller.search_accounts(self.search_var.get())
 
     def refresh_account_list(self):
-        self.account_ids.clear()
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
-        accounts = self.controller.get_accounts()
-        for account in accounts:
-            item_id = self.tree.insert('', 'end', values=account[1:])  # Skip account_id
-            self.account_ids[item_id] = account[0]  # Store account_id mapping
+        """Request a reload; rows arrive page by page through set_account_page"""
+        self.controller.refresh_account_list()
+
+    def reset_account_list(self, total):
+        self.account_list.reset(total)
+
+    def set_account_page(self, index, accounts):
+        self.account_list.set_page(index, accounts)
 
     def on_account_select(self, event):
-        selected = self.tree.selection()
-        if not selected:
+        account_id = self.account_list.selected_id()
+        if not self.tree.selection() or not account_id:
             return
             
         # Clear current form
         self.clear_form()
         
-        # Get account ID and load details
-        account_id = self.account_ids.get(selected[0])
+        # Load details
         if account_id:
             self.current_account_id = account_id
             self.controller.load_account(account_id)
@@ -250,7 +256,7 @@ class AccountView(BaseView):
         return self.category_map.get(display_value)
 
     def handle_save(self):
-        """Direct save without any verification"""
+        """Direct save without any verification; the controller reports the result"""
         try:
             password = self.entries['password'].get()
             data = {
@@ -268,10 +274,6 @@ class AccountView(BaseView):
                 self.controller.update_account(data)
             else:
                 self.controller.save_account(data)  # Pass data directly to save_account
-                
-            self.refresh_account_list()
-            messagebox.showinfo("Success", "Account saved successfully!")
-            self.clear_form()
             
         except Exception as e:
             messagebox.showerror("Error", str(e))
@@ -298,30 +300,55 @@ class AccountView(BaseView):
             messagebox.showwarning("Warning", "Please select an account first")
             return
             
-        # Get encrypted password from database
-        account_data = self.controller.model.get_account_by_id(self.current_account_id)
-        if not account_data or 'encrypted_password' not in account_data:
+        # Fetch only the ciphertext; it is decrypted after verification
+        self.controller.fetch_encrypted_password(
+            self.current_account_id, self.copy_encrypted_password
+        )
+
+    def copy_encrypted_password(self, encrypted_password):
+        if not encrypted_password:
             messagebox.showerror("Error", "Failed to get password")
             return
-        
-        # Show preview frame for verification
+
+        copied = self.with_face_preview(
+            lambda canvas, status_label: self.security.secure_copy_password(
+                encrypted_password, canvas, status_label)
+        )
+        if copied:
+            messagebox.showinfo("Success", "Password copied to clipboard\nWill clear in 30 seconds")
+        elif copied is not None:
+            messagebox.showerror("Error", "Failed to copy password - Face verification required")
+
+    def with_face_preview(self, check):
+        """Run ``check(canvas, status_label)`` with the verification preview shown.
+
+        The camera work runs on a worker while the preview draws here, so the
+        window stays responsive. Returns None without calling ``check`` if a
+        verification is already in progress.
+        """
+        if self.verifying:
+            return None
+        self.verifying = True
         self.preview_frame.grid()
         self.preview_canvas.delete("all")
         self.status_label.config(text="Starting face verification...")
-        self.update()
-        
         try:
-            if self.security.secure_copy_password(
-                account_data['encrypted_password'],
-                self.preview_canvas, 
-                self.status_label
-            ):
-                messagebox.showinfo("Success", "Password copied to clipboard\nWill clear in 30 seconds")
-            else:
-                messagebox.showerror("Error", "Failed to copy password - Face verification required")
+            return check(self.preview_canvas, self.status_label)
         finally:
+            self.verifying = False
             self.preview_frame.grid_remove()
 
+    def reveal_password(self):
+        """Decrypt the selected account's password into the form on request"""
+        if not self.current_account_id:
+            messagebox.showwarning("Warning", "Please select an account first")
+            return
+        self.controller.reveal_password(self.current_account_id)
+
+    def set_password(self, password):
+        self.entries['password'].delete(0, tk.END)
+        self.entries['password'].insert(0, password)
+
     def show_analytics(self):
         """Show analytics window"""
         if hasattr(self.parent, 'show_analytics'):
@@ -1,8 +1,12 @@
 import tkinter as tk
 from tkinter import ttk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from .base_view import BaseView
+from config import Config
+from utils.lazy_import import lazy_import
+
+# matplotlib costs hundreds of milliseconds; load it with the first chart
+plt = lazy_import('matplotlib.pyplot')
+backend_tkagg = lazy_import('matplotlib.backends.backend_tkagg')
 
 class AnalyticsView(BaseView):
     def __init__(self, parent, controller):
@@ -26,6 +30,19 @@ class AnalyticsView(BaseView):
             command=self.master.destroy
         ).pack(side=tk.RIGHT, padx=5)
         
+        # History range; the model picks the bucket size to match
+        ttk.Label(button_frame, text="History:").pack(side=tk.LEFT, padx=5)
+        self.range_var = tk.StringVar(value=Config.ANALYTICS_DEFAULT_RANGE)
+        range_box = ttk.Combobox(
+            button_frame,
+            textvariable=self.range_var,
+            values=list(Config.ANALYTICS_HISTORY_RANGES),
+            state='readonly',
+            width=8
+        )
+        range_box.pack(side=tk.LEFT)
+        range_box.bind('<<ComboboxSelected>>', lambda e: self.refresh_analytics())
+        
         # Top stats panel
         stats_frame = ttk.LabelFrame(container, text="Password Statistics")
         stats_frame.pack(fill=tk.X, pady=(0, 10))
@@ -49,7 +66,7 @@ class AnalyticsView(BaseView):
         graph_frame.pack(fill=tk.BOTH, expand=True)
         
         self.figure, self.ax = plt.subplots(figsize=(10, 6))
-        self.canvas = FigureCanvasTkAgg(self.figure, graph_frame)
+        self.canvas = backend_tkagg.FigureCanvasTkAgg(self.figure, graph_frame)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
         
         # Refresh button
@@ -99,4 +116,4 @@ class AnalyticsView(BaseView):
         
     def refresh_analytics(self):
         """Refresh analytics data"""
-        self.controller.refresh_analytics()
+        self.controller.refresh_analytics(self.range_var.get())
@@ -1,8 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
-import time
-import cv2
+from utils.lazy_import import lazy_import
+from utils.services import services
+from utils.preview import PreviewPipeline
+
+cv2 = lazy_import('cv2')
 
 class FaceRegistrationWindow(tk.Toplevel):
     def __init__(self, parent, username, security, on_complete):
@@ -12,8 +15,11 @@ class FaceRegistrationWindow(tk.Toplevel):
         self.on_complete = on_complete
         self.camera_ready = False
         self.camera = None
+        self.preview = None
         self.preview_thread = None
         self.running = False
+        self.latest_frame = None  # Newest raw frame shown, and whether it had a face
+        self.latest_has_face = False
         
         self.title("Face Registration")
         self.geometry("800x600")
@@ -27,8 +33,8 @@ class FaceRegistrationWindow(tk.Toplevel):
     def check_camera(self):
         """Check if camera is available"""
         try:
-            self.camera = cv2.VideoCapture(0)
-            if not self.camera.isOpened():
+            self.camera = services.get('camera').subscribe()
+            if not self.camera.is_opened():
                 raise Exception("Failed to open camera")
             
             ret, _ = self.camera.read()
@@ -44,31 +50,19 @@ class FaceRegistrationWindow(tk.Toplevel):
             self.handle_error(f"Camera error: {str(e)}\nPlease check your camera connection.")
 
     def start_preview(self):
-        """Start camera preview thread"""
+        """Detect faces on a worker thread; the Tk thread only draws the newest result"""
         self.running = True
+        self.preview = PreviewPipeline(self, self.canvas, on_update=self.on_preview_frame)
         
         def preview_loop():
-            while self.running and self.winfo_exists():
+            tracker = self.security.new_face_tracker()
+            while self.running:
                 try:
-                    ret, frame = self.camera.read()
-                    if ret:
-                        # Detect face
-                        has_face = self.security._detect_face(frame)[0]
-                        
-                        # Draw guide circle
-                        height, width = frame.shape[:2]
-                        center_x, center_y = width // 2, height // 2
-                        cv2.circle(frame, (center_x, center_y), 
-                                 min(center_x, center_y) - 50, 
-                                 (0, 255, 0) if has_face else (0, 0, 255), 2)
-                        
-                        # Update status
-                        status = "Face detected - Press SPACE to capture" if has_face else "No face detected"
-                        self.after(0, lambda s=status: self.status_var.set(s))
-                        
-                        # Update preview using new method name
-                        self.security.update_preview(self.canvas, frame)
-                    time.sleep(0.03)  # ~30 FPS
+                    ret, frame = self.camera.read()  # Paced by the camera's frame rate
+                    if not ret:
+                        break  # Camera stopped delivering
+                    has_face, faces = self.security._detect_face(frame, tracker)
+                    self.preview.post(self.security._draw_guide(frame, faces), (frame, has_face))
                 except Exception as e:
                     print(f"Preview error: {e}")
                     break
@@ -76,6 +70,14 @@ class FaceRegistrationWindow(tk.Toplevel):
         self.preview_thread = threading.Thread(target=preview_loop)
         self.preview_thread.daemon = True
         self.preview_thread.start()
+        self.preview.start()
+
+    def on_preview_frame(self, info):
+        """Tk side of the preview: remember the frame and update the status"""
+        self.latest_frame, self.latest_has_face = info
+        self.status_var.set(
+            "Face detected - Press SPACE to capture" if self.latest_has_face else "No face detected"
+        )
 
     def setup_ui(self):
         # Status label with bigger font
@@ -147,15 +149,13 @@ class FaceRegistrationWindow(tk.Toplevel):
         if not self.camera_ready or not self.running:
             return
             
-        # Get current frame
-        ret, frame = self.camera.read()
-        if not ret:
+        # Use the frame on screen; its face check is already done
+        frame = self.latest_frame
+        if frame is None:
             self.handle_error("Failed to capture frame")
             return
             
-        # Check for face
-        has_face = self.security._detect_face(frame)[0]
-        if not has_face:
+        if not self.latest_has_face:
             messagebox.showwarning("No Face Detected", "Please position your face in the circle")
             return
             
@@ -163,6 +163,7 @@ class FaceRegistrationWindow(tk.Toplevel):
         try:
             face_path = self.security._get_user_face_path(self.username)
             cv2.imwrite(face_path, frame)
+            self.security.face_templates.invalidate(self.username)
             self.finish_capture(True)
         except Exception as e:
             self.handle_error(f"Failed to save face image: {str(e)}")
@@ -171,53 +172,7 @@ class FaceRegistrationWindow(tk.Toplevel):
         if not self.camera_ready:
             self.handle_error("Camera not ready")
             return
-        
-        self.status_var.set("Initializing camera...")
-        self.progress_var.set(0)
-        self.update()
-        
-        # Disable buttons during capture
-        for child in self.winfo_children():
-            if isinstance(child, ttk.Button):
-                child.configure(state='disabled')
-        
-        def update_progress():
-            for i in range(0, 101, 10):
-                if not self.winfo_exists():
-                    return
-                self.progress_var.set(i)
-                self.update()
-                time.sleep(0.1)
-        
-        def capture():
-            try:
-                # Start progress update
-                progress_thread = threading.Thread(target=update_progress)
-                progress_thread.daemon = True
-                progress_thread.start()
-                
-                # Do capture
-                self.status_var.set("Capturing... Please look at the camera")
-                success = self.security.capture_reference_image(self.username, self.canvas)
-                
-                if self.winfo_exists():
-                    self.after(0, lambda: self.finish_capture(success))
-                    
-            except Exception as e:
-                if self.winfo_exists():
-                    self.after(0, lambda: self.handle_error(str(e)))
-        
-        # Start capture thread
-        capture_thread = threading.Thread(target=capture)
-        capture_thread.daemon = True
-        capture_thread.start()
-        
-        # Add timeout
-        self.after(10000, lambda: self.check_timeout(capture_thread))
-    
-    def check_timeout(self, thread):
-        if thread.is_alive() and self.winfo_exists():
-            self.handle_error("Capture timeout - Please try again")
+        self.try_capture()
     
     def finish_capture(self, success):
         # Re-enable buttons
@@ -249,6 +204,15 @@ class FaceRegistrationWindow(tk.Toplevel):
         self.on_complete(False)
         self.destroy()
         
+    def destroy(self):
+        """Stop the preview and hand the camera back before closing"""
+        self.running = False
+        if self.preview is not None:
+            self.preview.stop()
+        if self.camera is not None:
+            self.camera.release()
+        super().destroy()
+        
     def on_cancel(self):
         """Clean up resources before closing"""
         self.running = False
@@ -281,7 +245,7 @@ class LoginView(ttk.Frame):
         self.preview_canvas.pack(pady=10)
         
         # Status label for feedback
-        self.status_label = ttk.Label(login_frame, text="Enter username to begin")
+        self.status_label = ttk.Label(login_frame, text="Enter username, or leave it blank to log in by face")
         self.status_label.pack(pady=5)
         
         # Buttons
@@ -295,9 +259,20 @@ class LoginView(ttk.Frame):
         self.register_btn.pack(side=tk.LEFT, padx=5)
         
     def start_login(self):
+        # The camera session keeps serving events; don't let a click start another
+        self.login_btn.state(['disabled'])
+        self.register_btn.state(['disabled'])
+        try:
+            self._login()
+        finally:
+            self.login_btn.state(['!disabled'])
+            self.register_btn.state(['!disabled'])
+
+    def _login(self):
         username = self.username_var.get().strip()
         if not username:
-            messagebox.showerror("Error", "Please enter username")
+            # No name typed: recognise whoever is at the camera (shared kiosks)
+            self.start_identification()
             return
             
         if not self.security.has_registered_face(username):
@@ -333,6 +308,21 @@ class LoginView(ttk.Frame):
             self.preview_canvas.configure(bg='white')
             self.status_label.config(text="Face verification failed. Please try again.")
             
+    def start_identification(self):
+        self.status_label.config(text="Looking for a registered face...")
+        self.update()
+        
+        username = self.security.identify_user(self.preview_canvas, self.status_label)
+        if username:
+            self.username_var.set(username)
+            self.status_label.config(text=f"Welcome, {username}!")
+            self.update()
+            self.after(1000, lambda: self.complete_login(username))
+        else:
+            self.preview_canvas.delete("all")
+            self.preview_canvas.configure(bg='white')
+            self.status_label.config(text="Face not recognised. Enter your username and try again.")
+            
     def complete_login(self, username):
         self.status_label.config(text="Loading account management...")
         self.update()